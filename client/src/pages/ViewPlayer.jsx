@@ -3,7 +3,6 @@ import { useParams, useLocation } from 'react-router-dom';
 import '../css/ViewPlayer.css'
 import PlayersAPI from '../services/PlayersAPI';
 import MatchHistoryAPI from '../services/MatchHistoryAPI';
-import PlayerStatsAPI from '../services/PlayerStatsAPI';
 import PlayerCard from '../components/PlayerCard';
 import MatchHistoryCard from '../components/MatchHistoryCard';
 
@@ -14,7 +13,8 @@ const ViewPlayer = () => {
 
     const [player, setPlayer] = useState(null);
     const [error, setError] = useState(null);
-    const [playerHistory, setPlayerHistory] = useState([]);
+    const [playerHistory, setPlayerHistory] = useState({});
+    const [historyCursor, setHistoryCursor] = useState(null);
     const [match, setMatchData] = useState([]);
     const [playerStats, setPlayerStats] = useState(null);
 
@@ -22,20 +22,17 @@ const ViewPlayer = () => {
     useEffect(() => {
         const fetchPlayerData = async () => {
             try {
-                // Fetch only if missing
-                const playerPromise = player
-                    ? Promise.resolve(player)
-                    : PlayersAPI.getPlayerByNameAndTag({ gameName, tagLine });
+                // Player, stats and the first history page in one request
+                const profile = await PlayersAPI.getPlayerProfile({ gameName, tagLine });
+                if (!profile) {
+                    setError("Failed to load player data.");
+                    return;
+                }
 
-                const [playerData, statsData, historyData] = await Promise.all([
-                    playerPromise,
-                    PlayerStatsAPI.getPlayerStats({ gameName, tagLine }),
-                    MatchHistoryAPI.getMatchHistoryOfPlayer({ gameName, tagLine }),
-                ]);
-
-                setPlayer(playerData);
-                setPlayerStats(statsData);
-                setPlayerHistory(historyData);
+                setPlayer(profile.player);
+                setPlayerStats(profile.stats);
+                setPlayerHistory(profile.matchHistory?.matches || {});
+                setHistoryCursor(profile.matchHistory?.nextCursor || null);
             } catch (err) {
                 console.error("Error fetching player data:", err);
                 setError("Failed to load player data.");
@@ -49,6 +46,12 @@ const ViewPlayer = () => {
         }
     }, [gameName, tagLine]);
 
+    const loadMoreHistory = async () => {
+        const historyData = await MatchHistoryAPI.getMatchHistoryOfPlayer({ gameName, tagLine }, historyCursor);
+        setPlayerHistory((prev) => ({ ...prev, ...(historyData?.matches || {}) }));
+        setHistoryCursor(historyData?.nextCursor || null);
+    };
+
     if (error) return <div>{error}</div>;
     if (!player) return <div>Loading player...</div>;
     console.log(player)
@@ -66,7 +69,10 @@ const ViewPlayer = () => {
                 champions={playerStats?.topChampions || {}}
                 winrate={playerStats?.winrate || "None"}
             />
-            <MatchHistoryCard matchHistory={playerHistory || []} />
+            <MatchHistoryCard matchHistory={playerHistory || {}} />
+            {historyCursor && (
+                <button onClick={loadMoreHistory}>Load more</button>
+            )}
         </div>
     );
 };
@@ -1,11 +1,13 @@
 const API_URL = import.meta.env.VITE_MATCH_HISTORY_API_PATH;
 const MatchesAPI = {
-    getMatchHistoryOfPlayer: async (playerData) => {
+    // Returns one page: { matches, nextCursor }. Pass nextCursor as `before` for the next page.
+    getMatchHistoryOfPlayer: async (playerData, before = null) => {
         try {
             const gameName = playerData.gameName.trim();
             const tagLine = playerData.tagLine.trim();
+            const cursor = before ? `&before=${encodeURIComponent(before)}` : '';
 
-            const response = await fetch(`${API_URL}?gameName=${gameName}&tagLine=${tagLine}`)
+            const response = await fetch(`${API_URL}?gameName=${gameName}&tagLine=${tagLine}${cursor}`)
             if (!response.ok) {
                 throw new Error(`Player with name ${gameName} and ${tagLine} does not exist.`)
             }
@@ -47,6 +47,25 @@ const PlayerStatsAPI = {
             //throw(error)
         }
     },
+
+    // window: { games: 10 } / { games: 20 } for recent games, { days: 7 } / { days: 30 } for recent days
+    getPlayerStatsWindow: async(playerData, window) => {
+        try {
+            const gameName = playerData.gameName.trim();
+            const tagLine = playerData.tagLine.trim();
+            const [name, value] = Object.entries(window)[0];
+
+            const response = await fetch(`${API_URL}/window?gameName=${gameName}&tagLine=${tagLine}&${name}=${value}`)
+            if (!response.ok) {
+                throw new Error(`No recent stats for ${gameName}#${tagLine}`)
+            }
+            const data = await response.json()
+            return data
+        } catch(error) {
+            console.error(error.message)
+            throw error
+        }
+    },
 };
 
 export default PlayerStatsAPI;
\ No newline at end of file
@@ -49,6 +49,23 @@ const PlayersAPI = {
         }
     },
 
+    // One request for the profile page: { player, stats, matchHistory: { matches, nextCursor } }
+    getPlayerProfile: async (playerData) => {
+        try {
+            const gameName = playerData.gameName.trim();
+            const tagLine = playerData.tagLine.trim();
+
+            const response = await fetch(`${API_URL}/profile?gameName=${gameName}&tagLine=${tagLine}`)
+            if (!response.ok) {
+                throw new Error(`Player with name ${gameName} and ${tagLine} does not exist.`)
+            }
+            const data = await response.json()
+            return data
+        } catch(error) {
+            console.error(`Error fetching profile for Riot ID: ${playerData.gameName}#${playerData.tagLine}`)
+        }
+    },
+
     // Handles Request for All:
     // Player, Player Stats, MatchData, MatchTimeline
     upsertPlayer: async (playerData) => {
@@ -0,0 +1,21 @@
+const API_URL = import.meta.env.VITE_STATIC_DATA_API_PATH;
+const StaticDataAPI = {
+    // Champion, item, rune and spell names keyed by numeric id:
+    // { version, champions: { key: [id, name] }, spells, runes, items }
+    getStaticData: async (version = null) => {
+        try {
+            const query = version ? `?version=${encodeURIComponent(version)}` : '';
+
+            const response = await fetch(`${API_URL}${query}`)
+            if (!response.ok) {
+                throw new Error(`Static data for version ${version} is unavailable.`)
+            }
+            const data = await response.json()
+            return data
+        } catch(error) {
+            console.error(`Error fetching static data for version ${version}`)
+        }
+    },
+};
+
+export default StaticDataAPI;
\ No newline at end of file
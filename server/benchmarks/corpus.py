@@ -0,0 +1,161 @@
+""" Seeded synthetic match-v5 corpus for the benchmarks.
+
+Documents carry every field the match worker indexes and the stat queries read,
+with ids drawn from the bundled static-data snapshot. Each participant also gets
+filler `challenges` so a document is about the size of a real match (~40 KB);
+JSON_TABLE strategies scale with document size, not just match count.
+"""
+import json
+import os
+import random
+import string
+import time
+
+SNAPSHOT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda-function", "src", "static_data"
+)
+
+# teamPosition -> (lane, role) as match-v5 reports them
+POSITIONS = {
+    "TOP": ("TOP", "SOLO"),
+    "JUNGLE": ("JUNGLE", "NONE"),
+    "MIDDLE": ("MIDDLE", "SOLO"),
+    "BOTTOM": ("BOTTOM", "CARRY"),
+    "UTILITY": ("BOTTOM", "SUPPORT"),
+}
+
+# Real match documents carry ~125 challenges per participant
+FILLER_CHALLENGES = 110
+# Other players sampled into the focus player's matches
+OPPONENT_POOL = 5000
+# Mean time between two of the focus player's games
+MEAN_GAP_MS = 8 * 60 * 60 * 1000
+
+def load_snapshot():
+    versions = sorted(name for name in os.listdir(SNAPSHOT_DIR) if name.endswith(".json"))
+    with open(os.path.join(SNAPSHOT_DIR, versions[-1])) as f:
+        return json.load(f)
+
+def random_puuid(rng):
+    alphabet = string.ascii_letters + string.digits + "-_"
+    return "".join(rng.choice(alphabet) for _ in range(78))
+
+class Corpus:
+    """ Generates the same matches for the same seed. The focus player appears in
+        every match, usually in one main position, ending just before `now_ms`.
+    """
+
+    def __init__(self, seed, now_ms=None):
+        self.rng = random.Random(seed)
+        self.now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        snapshot = load_snapshot()
+        self.game_version = f"{snapshot['version']}.1"
+        self.champions = sorted((int(key), value[0]) for key, value in snapshot["champions"].items())
+        self.spells = sorted(int(key) for key in snapshot["spells"])
+        self.styles = sorted(int(key) for key in snapshot["runes"] if int(key) % 100 == 0)
+        self.perks = sorted(int(key) for key in snapshot["runes"] if int(key) % 100)
+        self.filler = [f"challenge{idx}" for idx in range(FILLER_CHALLENGES)]
+        self.opponents = [random_puuid(self.rng) for _ in range(OPPONENT_POOL)]
+        self.focus_puuid = random_puuid(self.rng)
+        self.main_position = self.rng.choice(list(POSITIONS))
+
+    def matches(self, count, region="NA1"):
+        """ Yields (matchId, match document), newest first
+        """
+        timestamp = self.now_ms - 60 * 60 * 1000
+        for idx in range(count):
+            match_id = f"{region}_{9000000000 - idx}"
+            yield match_id, self.match(match_id, timestamp)
+            timestamp -= int(self.rng.expovariate(1 / MEAN_GAP_MS)) + 1
+
+    def match(self, match_id, game_start):
+        rng = self.rng
+        duration = rng.randint(15 * 60, 45 * 60)
+        winning_team = rng.choice((100, 200))
+
+        focus_position = self.main_position if rng.random() < 0.75 else rng.choice(list(POSITIONS))
+        focus_team = rng.choice((100, 200))
+        puuids = iter(rng.sample(self.opponents, 9))
+        champions = iter(rng.sample(self.champions, 10))
+
+        participants = []
+        for team_id in (100, 200):
+            for position in POSITIONS:
+                is_focus = team_id == focus_team and position == focus_position
+                puuid = self.focus_puuid if is_focus else next(puuids)
+                participants.append(self.participant(
+                    len(participants) + 1, puuid, team_id, position, next(champions),
+                    team_id == winning_team, duration
+                ))
+
+        return {
+            "metadata": {
+                "matchId": match_id,
+                "participants": [p["puuid"] for p in participants],
+            },
+            "info": {
+                "gameStartTimestamp": game_start,
+                "gameDuration": duration,
+                "gameVersion": self.game_version,
+                "queueId": 420,
+                "participants": participants,
+            },
+        }
+
+    def participant(self, participant_id, puuid, team_id, position, champion, win, duration):
+        rng = self.rng
+        minutes = duration / 60
+        lane, role = POSITIONS[position]
+        kills, deaths, assists = rng.randint(0, 15), rng.randint(0, 12), rng.randint(0, 25)
+        support = position == "UTILITY"
+        gold = int(minutes * rng.uniform(250, 330 if support else 480))
+        minions = 0 if position in ("JUNGLE", "UTILITY") else int(minutes * rng.uniform(4, 9))
+        neutral = int(minutes * rng.uniform(4, 7)) if position == "JUNGLE" else rng.randint(0, 10)
+        vision = int(minutes * rng.uniform(1.5 if support else 0.4, 3.0 if support else 1.2))
+        primary, secondary = rng.sample(self.styles, 2)
+
+        challenges = {
+            "kda": (kills + assists) / max(deaths, 1),
+            "killParticipation": rng.uniform(0.2, 0.8),
+            "damagePerMinute": rng.uniform(150 if support else 400, 500 if support else 1200),
+            "teamDamagePercentage": rng.uniform(0.05, 0.35),
+            "soloKills": rng.randint(0, 4),
+            "goldPerMinute": gold / minutes,
+            "visionScorePerMinute": vision / minutes,
+        }
+        for name in self.filler:
+            challenges[name] = round(rng.uniform(0, 1000), 3)
+
+        return {
+            "participantId": participant_id,
+            "puuid": puuid,
+            "riotIdGameName": f"bench{puuid[:8]}",
+            "riotIdTagline": "NA1",
+            "teamId": team_id,
+            "championId": champion[0],
+            "championName": champion[1],
+            "lane": lane,
+            "role": role,
+            "teamPosition": position,
+            "win": win,
+            "kills": kills,
+            "deaths": deaths,
+            "assists": assists,
+            "goldEarned": gold,
+            "totalMinionsKilled": minions,
+            "neutralMinionsKilled": neutral,
+            "visionScore": vision,
+            "wardsPlaced": int(vision * rng.uniform(0.3, 0.6)),
+            "wardsKilled": int(vision * rng.uniform(0.05, 0.3)),
+            "damageDealtToObjectives": rng.randint(0, 30000),
+            "damageDealtToTurrets": rng.randint(0, 12000),
+            "turretTakedowns": rng.randint(0, 5),
+            "summoner1Id": rng.choice(self.spells),
+            "summoner2Id": rng.choice(self.spells),
+            "perks": {"styles": [
+                {"style": primary, "selections": [{"perk": rng.choice(self.perks)}]},
+                {"style": secondary, "selections": []},
+            ]},
+            "challenges": challenges,
+            **{f"item{idx}": rng.randint(1001, 7000) for idx in range(7)},
+        }
@@ -0,0 +1,294 @@
+""" Times every player stat query strategy against a seeded synthetic corpus.
+
+    python3 server/benchmarks/run_benchmarks.py --sizes 10 100 1000 10000 --output report.json
+
+For each size, the database is recreated and loaded with that many matches for one
+player through the match worker's own ingest path (MatchData, then index_match_data)
+and the player worker's fold_new_player_matches. Every strategy in strategies.py
+is then run --repeat times after one warm-up run.
+
+MySQL runs in a throwaway Docker container (mysql:8.0 on a tmpfs) unless --host
+points at an existing server. The report is printed as a table and, with --output,
+written as JSON; pass an earlier report as --baseline to print the change per row.
+The match worker imports boto3, which Lambda provides; install it locally to run this.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(BENCHMARK_DIR)
+MATCH_WORKER_SRC = os.path.join(SERVER_DIR, "match-lambda-handler", "src")
+PLAYER_WORKER_SRC = os.path.join(SERVER_DIR, "player-lambda-handler", "src")
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DOCKER_IMAGE = "mysql:8.0"
+DOCKER_CONTAINER = "rift-rewind-bench"
+DOCKER_PORT = 3307
+DOCKER_PASSWORD = "bench"
+DATABASE = "rift_rewind_bench"
+LOAD_BATCH = 200
+
+# Tables the Lambdas read but no worker creates
+BASE_SCHEMA = [
+    """ CREATE TABLE IF NOT EXISTS MatchData (
+            matchId   VARCHAR(32) NOT NULL PRIMARY KEY,
+            matchData JSON
+        )
+    """,
+]
+
+def load_worker(name, src_dir):
+    """ Imports a worker's lambda_function under `name`, with its src dir on the path
+        for its own imports (player_stats, match_card, the vendored mysql connector)
+    """
+    sys.path.insert(0, src_dir)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(src_dir, "lambda_function.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+""" ----- MYSQL ----- """
+def start_container():
+    subprocess.run(["docker", "rm", "-f", DOCKER_CONTAINER], capture_output=True)
+    subprocess.run(
+        ["docker", "run", "-d", "--name", DOCKER_CONTAINER,
+         "-e", f"MYSQL_ROOT_PASSWORD={DOCKER_PASSWORD}",
+         "-p", f"{DOCKER_PORT}:3306",
+         "--tmpfs", "/var/lib/mysql",
+         DOCKER_IMAGE, "--innodb-buffer-pool-size=1G"],
+        check=True, capture_output=True
+    )
+
+def stop_container():
+    subprocess.run(["docker", "rm", "-f", DOCKER_CONTAINER], capture_output=True)
+
+def connect(args, timeout=120):
+    """ Connects to the server, waiting up to `timeout` seconds for it to accept connections
+    """
+    import mysql.connector
+    deadline = time.time() + timeout
+    while True:
+        try:
+            return mysql.connector.connect(host=args.host, port=args.port, user=args.user, password=args.password)
+        except mysql.connector.Error:
+            if time.time() > deadline:
+                raise
+            time.sleep(2)
+
+def reset_database(conn, match_worker, player_worker):
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {DATABASE}")
+    cursor.execute(f"CREATE DATABASE {DATABASE}")
+    cursor.execute(f"USE {DATABASE}")
+    # Both workers create DataVersion; every statement is IF NOT EXISTS
+    for statement in BASE_SCHEMA + match_worker.SCHEMA + player_worker.SCHEMA:
+        cursor.execute(statement)
+    conn.commit()
+    cursor.close()
+
+""" ----- CORPUS ----- """
+def load_corpus(conn, corpus, size, match_worker, player_worker):
+    """ Ingests `size` matches for the corpus' focus player the way the workers do
+        Return: {"matches", "documentBytes", "seconds"}
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    document_bytes = 0
+    for idx, (match_id, match) in enumerate(corpus.matches(size), 1):
+        document = json.dumps(match)
+        document_bytes += len(document)
+        cursor.execute("INSERT INTO MatchData (matchId, matchData) VALUES (%s, %s)", (match_id, document))
+        match_worker.index_match_data(cursor, match_id, match)
+        if idx % LOAD_BATCH == 0:
+            conn.commit()
+    conn.commit()
+    cursor.close()
+
+    cursor = conn.cursor(dictionary=True)
+    player_worker.fold_new_player_matches(cursor, corpus.focus_puuid)
+    conn.commit()
+    cursor.close()
+
+    cursor = conn.cursor()
+    cursor.execute("ANALYZE TABLE MatchData, ParticipantStats, PlayerMatch, PlayerStatsDay")
+    cursor.fetchall()
+    cursor.close()
+    return {"matches": size, "documentBytes": document_bytes, "seconds": time.perf_counter() - start}
+
+""" ----- TIMING ----- """
+class CountingCursor:
+    """ Wraps a cursor to count the statements a strategy sends
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.queries = 0
+
+    def execute(self, *args, **kwargs):
+        self.queries += 1
+        return self.cursor.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+def time_strategy(conn, function, puuid, repeat):
+    """ Runs one strategy once to warm up, then `repeat` timed runs
+        Return: (result of the last run, {"queries", "minMs", "medianMs", "p95Ms"})
+    """
+    cursor = CountingCursor(conn.cursor(dictionary=True, buffered=True))
+    result = function(cursor, puuid)
+    queries = cursor.queries
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(cursor, puuid)
+        timings.append((time.perf_counter() - start) * 1000)
+    cursor.close()
+
+    timings.sort()
+    return result, {
+        "queries": queries,
+        "minMs": timings[0],
+        "medianMs": statistics.median(timings),
+        "p95Ms": timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))],
+    }
+
+def comparable(result):
+    """ Rounds a result so strategies that differ only in float summation order compare equal
+    """
+    if isinstance(result, dict):
+        return {key: comparable(value) for key, value in result.items()}
+    if isinstance(result, float):
+        return round(result, 6)
+    return result
+
+def run_size(conn, args, corpus_class, size, match_worker, player_worker, strategies):
+    reset_database(conn, match_worker, player_worker)
+    corpus = corpus_class(args.seed)
+    load = load_corpus(conn, corpus, size, match_worker, player_worker)
+    print(f"Loaded {size} matches ({load['documentBytes'] / 2**20:.1f} MB of JSON) in {load['seconds']:.1f}s",
+          file=sys.stderr)
+
+    rows = []
+    references = {}
+    for group, name, function in strategies:
+        result, timing = time_strategy(conn, function, corpus.focus_puuid, args.repeat)
+        reference = references.setdefault(group, comparable(result))
+        rows.append({
+            "group": group,
+            "strategy": name,
+            "matches": size,
+            **timing,
+            "matchesReference": comparable(result) == reference if group in args.checked_groups else None,
+        })
+        print(f"  {group}/{name}: {timing['medianMs']:.2f} ms", file=sys.stderr)
+    return load, rows
+
+""" ----- REPORT ----- """
+def report_key(row):
+    return (row["group"], row["strategy"], row["matches"])
+
+def format_report(rows, baseline_rows=None):
+    baseline = {report_key(row): row for row in baseline_rows or []}
+    header = ["group", "strategy", "matches", "queries", "median ms", "p95 ms", "min ms", "check"]
+    if baseline:
+        header.append("vs baseline")
+
+    lines = []
+    for row in rows:
+        check = {True: "ok", False: "MISMATCH", None: "-"}[row["matchesReference"]]
+        line = [row["group"], row["strategy"], str(row["matches"]), str(row["queries"]),
+                f"{row['medianMs']:.2f}", f"{row['p95Ms']:.2f}", f"{row['minMs']:.2f}", check]
+        if baseline:
+            previous = baseline.get(report_key(row))
+            line.append(f"{row['medianMs'] / previous['medianMs']:.2f}x" if previous else "new")
+        lines.append(line)
+
+    widths = [max(len(header[idx]), *(len(line[idx]) for line in lines)) for idx in range(len(header))]
+    out = [" | ".join(cell.ljust(width) for cell, width in zip(header, widths)),
+           "-+-".join("-" * width for width in widths)]
+    out += [" | ".join(cell.ljust(width) for cell, width in zip(line, widths)) for line in lines]
+    return "\n".join(out)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark player stat query strategies")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="matches per player")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per strategy")
+    parser.add_argument("--seed", type=int, default=402, help="corpus seed")
+    parser.add_argument("--only", nargs="+", default=[], help="run strategies whose group/name contains any of these")
+    parser.add_argument("--host", help="use this MySQL server instead of starting a Docker container")
+    parser.add_argument("--port", type=int, default=3306)
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--keep-container", action="store_true", help="leave the Docker container running")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+    args.docker = not args.host
+    if args.docker:
+        args.host, args.port, args.user, args.password = "127.0.0.1", DOCKER_PORT, "root", DOCKER_PASSWORD
+    return args
+
+def main():
+    args = parse_args()
+
+    # The workers read their RDS settings at import; the harness connects on its own
+    for name, value in (("RDS_USER", args.user), ("RDS_PASSWORD", args.password), ("RDS_HOST", args.host)):
+        os.environ.setdefault(name, value)
+    match_worker = load_worker("match_worker", MATCH_WORKER_SRC)
+    player_worker = load_worker("player_worker", PLAYER_WORKER_SRC)
+    sys.path.insert(0, BENCHMARK_DIR)
+    from corpus import Corpus
+    from strategies import STRATEGIES, CHECKED_GROUPS
+    args.checked_groups = CHECKED_GROUPS
+
+    strategies = [
+        (group, name, function) for group, name, function in STRATEGIES
+        if not args.only or any(term in f"{group}/{name}" for term in args.only)
+    ]
+
+    if args.docker:
+        start_container()
+    try:
+        conn = connect(args)
+        cursor = conn.cursor()
+        cursor.execute("SELECT VERSION()")
+        server_version = cursor.fetchone()[0]
+        cursor.close()
+
+        loads, rows = [], []
+        for size in args.sizes:
+            load, size_rows = run_size(conn, args, Corpus, size, match_worker, player_worker, strategies)
+            loads.append(load)
+            rows.extend(size_rows)
+        conn.close()
+    finally:
+        if args.docker and not args.keep_container:
+            stop_container()
+
+    baseline_rows = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_rows = json.load(f)["results"]
+    print(format_report(rows, baseline_rows))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "seed": args.seed,
+                "repeat": args.repeat,
+                "mysql": server_version,
+                "loads": loads,
+                "results": rows,
+            }, f, indent=2)
+        print(f"Wrote {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+""" Query strategies for the player stat functions, one function per strategy.
+
+Each strategy takes (cursor, puuid) with a dictionary cursor and returns a result
+in a shape shared by its group, so the harness can check strategies agree:
+    role_stats:   {role_key: games}
+    player_stats: player_stats.finalize_totals() fields
+    window:       player_stats.finalize_totals() fields over the window
+The JSON_TABLE and N+1 JSON_SEARCH strategies are the queries the player worker
+used before ParticipantStats existed; the others are what the Lambdas run today.
+"""
+import json
+import re
+from datetime import datetime, timedelta, timezone
+
+from player_stats import (
+    PARTICIPANT_COLUMNS, METRICS, new_totals, fold_match, merge_totals, finalize_totals,
+    role_key, primary_role, top_champions,
+)
+
+# ParticipantStats column -> JSON_TABLE column over '$.info.participants[*]'
+JSON_COLUMNS = {
+    "puuid": "puuid VARCHAR(100) PATH '$.puuid'",
+    "teamId": "teamId INT PATH '$.teamId'",
+    "championName": "championName VARCHAR(100) PATH '$.championName'",
+    "lane": "lane VARCHAR(20) PATH '$.lane'",
+    "role": "role VARCHAR(20) PATH '$.role'",
+    "win": "win BOOLEAN PATH '$.win'",
+    "kda": "kda DOUBLE PATH '$.challenges.kda'",
+    "killParticipation": "killParticipation DOUBLE PATH '$.challenges.killParticipation'",
+    "damagePerMinute": "damagePerMinute DOUBLE PATH '$.challenges.damagePerMinute'",
+    "teamDamagePercentage": "teamDamagePercentage DOUBLE PATH '$.challenges.teamDamagePercentage'",
+    "soloKills": "soloKills INT PATH '$.challenges.soloKills'",
+    "goldPerMinute": "goldPerMinute DOUBLE PATH '$.challenges.goldPerMinute'",
+    "visionScorePerMinute": "visionScorePerMinute DOUBLE PATH '$.challenges.visionScorePerMinute'",
+    "goldEarned": "goldEarned INT PATH '$.goldEarned'",
+    "totalMinionsKilled": "totalMinionsKilled INT PATH '$.totalMinionsKilled'",
+    "neutralMinionsKilled": "neutralMinionsKilled INT PATH '$.neutralMinionsKilled'",
+    "visionScore": "visionScore INT PATH '$.visionScore'",
+    "wardsKilled": "wardsKilled INT PATH '$.wardsKilled'",
+    "damageDealtToObjectives": "damageDealtToObjectives INT PATH '$.damageDealtToObjectives'",
+    "damageDealtToTurrets": "damageDealtToTurrets INT PATH '$.damageDealtToTurrets'",
+    "turretTakedowns": "turretTakedowns INT PATH '$.turretTakedowns'",
+}
+
+# Values from the match rather than the participant
+GAME_START = "CAST(JSON_EXTRACT(m.matchData, '$.info.gameStartTimestamp') AS UNSIGNED)"
+GAME_DURATION = "CAST(JSON_EXTRACT(m.matchData, '$.info.gameDuration') AS UNSIGNED)"
+TEAM_GOLD = """(SELECT SUM(t.goldEarned)
+                FROM JSON_TABLE(m.matchData, '$.info.participants[*]'
+                     COLUMNS (teamId INT PATH '$.teamId', goldEarned INT PATH '$.goldEarned')) AS t
+                WHERE t.teamId = p.teamId)"""
+
+# One aggregate per metric, the way each calculate_player_* function queried it
+METRIC_EXPRESSIONS = {
+    "dmg_percent": "AVG(p.teamDamagePercentage)",
+    "dpm": "AVG(p.damagePerMinute)",
+    "kda": "AVG(p.kda)",
+    "solo_kills": "AVG(p.soloKills)",
+    "kp": "AVG(p.killParticipation)",
+    "gpm": "AVG(p.goldPerMinute)",
+    "gold_percentage": f"AVG(p.goldEarned / NULLIF({TEAM_GOLD}, 0))",
+    "cspm": f"AVG((p.totalMinionsKilled + p.neutralMinionsKilled) / NULLIF({GAME_DURATION} / 60, 0))",
+    "avg_vpm": "AVG(p.visionScorePerMinute)",
+    "avg_vision_score": "AVG(p.visionScore)",
+    "avg_wards_cleared": "AVG(p.wardsKilled)",
+    "avg_dmg_to_objectives": "AVG(p.damageDealtToObjectives)",
+    "avg_dmg_to_turrets": "AVG(p.damageDealtToTurrets)",
+    "avg_turret_takedowns": "AVG(p.turretTakedowns)",
+}
+
+WINDOW_GAMES = 20
+WINDOW_DAYS = 30
+
+def json_table(columns):
+    """ Returns a JOIN JSON_TABLE clause over the participants with the given columns
+    """
+    definitions = ", ".join(JSON_COLUMNS[column] for column in ["puuid", *columns])
+    return f"""JOIN JSON_TABLE(m.matchData, '$.info.participants[*]' COLUMNS ({definitions})) AS p"""
+
+def columns_of(expression):
+    return sorted(set(re.findall(r"\bp\.(\w+)", expression)))
+
+""" ----- ROLE STATS ----- """
+def role_stats_json_table(cursor, puuid):
+    cursor.execute(
+        f""" SELECT p.lane, p.role, COUNT(*) AS times_played
+             FROM MatchData m
+             {json_table(['lane', 'role'])}
+             WHERE p.puuid = %s
+             GROUP BY p.lane, p.role
+        """, (puuid,))
+    res = {}
+    for row in cursor.fetchall():
+        key = role_key(row['lane'], row['role'])
+        res[key] = res.get(key, 0) + row['times_played']
+    return res
+
+def role_stats_json_search(cursor, puuid):
+    cursor.execute("SELECT matchId FROM ParticipantStats WHERE puuid = %s", (puuid,))
+    match_ids = [row['matchId'] for row in cursor.fetchall()]
+    res = {}
+    for match_id in match_ids:
+        cursor.execute(
+            """ SELECT JSON_UNQUOTE(JSON_EXTRACT(matchData, CONCAT('$.info.participants[', idx, '].lane'))) AS lane,
+                       JSON_UNQUOTE(JSON_EXTRACT(matchData, CONCAT('$.info.participants[', idx, '].role'))) AS role
+                FROM (
+                    SELECT matchData,
+                           REPLACE(REPLACE(JSON_UNQUOTE(JSON_SEARCH(
+                               JSON_EXTRACT(matchData, '$.info.participants[*].puuid'), 'one', %s
+                           )), '$[', ''), ']', '') AS idx
+                    FROM MatchData
+                    WHERE matchId = %s
+                ) AS m
+            """, (puuid, match_id))
+        row = cursor.fetchone()
+        key = role_key(row['lane'], row['role'])
+        res[key] = res.get(key, 0) + 1
+    return res
+
+def role_stats_participant_stats(cursor, puuid):
+    cursor.execute(
+        """ SELECT lane, role, COUNT(*) AS times_played
+            FROM ParticipantStats
+            WHERE puuid = %s
+            GROUP BY lane, role
+        """, (puuid,))
+    res = {}
+    for row in cursor.fetchall():
+        key = role_key(row['lane'], row['role'])
+        res[key] = res.get(key, 0) + row['times_played']
+    return res
+
+""" ----- PLAYER STATS ----- """
+def player_stats_json_table_per_metric(cursor, puuid):
+    """ One JSON_TABLE scan per stat function, like calculate_player_stats did
+    """
+    res = {"role": primary_role(role_stats_json_table(cursor, puuid))}
+
+    cursor.execute(
+        f""" SELECT p.championName, COUNT(*) AS times_played
+             FROM MatchData m
+             {json_table(['championName'])}
+             WHERE p.puuid = %s
+             GROUP BY p.championName
+        """, (puuid,))
+    res["topChampions"] = top_champions({row['championName']: row['times_played'] for row in cursor.fetchall()})
+
+    cursor.execute(
+        f""" SELECT AVG(p.win) AS winrate
+             FROM MatchData m
+             {json_table(['win'])}
+             WHERE p.puuid = %s
+        """, (puuid,))
+    winrate = cursor.fetchone()['winrate']
+    res["winrate"] = float(winrate) if winrate is not None else None
+
+    for column, metrics in METRICS.items():
+        res[column] = {}
+        for name in metrics:
+            expression = METRIC_EXPRESSIONS[name]
+            cursor.execute(
+                f""" SELECT {expression} AS value
+                     FROM MatchData m
+                     {json_table(columns_of(expression))}
+                     WHERE p.puuid = %s
+                """, (puuid,))
+            value = cursor.fetchone()['value']
+            res[column][name] = float(value) if value is not None else None
+    return res
+
+def player_stats_json_table_one_pass(cursor, puuid):
+    """ One JSON_TABLE scan for every column, folded with player_stats
+    """
+    columns = [column for column in JSON_COLUMNS if column not in ("puuid", "teamId")]
+    cursor.execute(
+        f""" SELECT m.matchId, {GAME_START} AS gameStartTimestamp, {GAME_DURATION} AS gameDuration,
+                    {TEAM_GOLD} AS teamGoldEarned, {", ".join(f"p.{column}" for column in columns)}
+             FROM MatchData m
+             {json_table(['teamId', *columns])}
+             WHERE p.puuid = %s
+        """, (puuid,))
+    totals = new_totals()
+    for row in cursor.fetchall():
+        row['teamGoldEarned'] = int(row['teamGoldEarned'])
+        fold_match(totals, row)
+    return finalize_totals(totals)
+
+def player_stats_participant_stats(cursor, puuid):
+    """ One pass over the player's ParticipantStats rows (the worker's first refresh)
+    """
+    cursor.execute(f"SELECT {PARTICIPANT_COLUMNS} FROM ParticipantStats WHERE puuid = %s", (puuid,))
+    totals = new_totals()
+    for row in cursor.fetchall():
+        fold_match(totals, row)
+    return finalize_totals(totals)
+
+def player_stats_incremental_totals(cursor, puuid):
+    """ Read of the running totals the worker maintains (every later refresh)
+    """
+    cursor.execute("SELECT totals FROM PlayerStatsTotals WHERE puuid = %s", (puuid,))
+    row = cursor.fetchone()
+    return finalize_totals(json.loads(row['totals']) if row else new_totals())
+
+""" ----- WINDOWS ----- """
+def window_last_games(cursor, puuid, games=WINDOW_GAMES):
+    """ /player/stat/window?games=N
+    """
+    cursor.execute(
+        f""" SELECT {PARTICIPANT_COLUMNS}
+             FROM ParticipantStats
+             WHERE puuid = %s
+             ORDER BY gameStartTimestamp DESC
+             LIMIT %s
+        """, (puuid, games))
+    totals = new_totals()
+    for row in cursor.fetchall():
+        fold_match(totals, row)
+    return finalize_totals(totals)
+
+def window_last_days(cursor, puuid, days=WINDOW_DAYS):
+    """ /player/stat/window?days=N
+    """
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    cursor.execute("SELECT totals FROM PlayerStatsDay WHERE puuid = %s AND day >= %s", (puuid, since))
+    totals = new_totals()
+    for row in cursor.fetchall():
+        merge_totals(totals, json.loads(row['totals']))
+    return finalize_totals(totals)
+
+# (group, strategy, function); the first strategy of a group is the reference the
+# others are checked against
+STRATEGIES = [
+    ("role_stats", "json_table", role_stats_json_table),
+    ("role_stats", "n_plus_one_json_search", role_stats_json_search),
+    ("role_stats", "participant_stats", role_stats_participant_stats),
+    ("player_stats", "json_table_per_metric", player_stats_json_table_per_metric),
+    ("player_stats", "json_table_one_pass", player_stats_json_table_one_pass),
+    ("player_stats", "participant_stats", player_stats_participant_stats),
+    ("player_stats", "incremental_totals", player_stats_incremental_totals),
+    ("window", f"last_{WINDOW_GAMES}_games", window_last_games),
+    ("window", f"last_{WINDOW_DAYS}_days", window_last_days),
+]
+
+# Groups whose strategies compute the same thing
+CHECKED_GROUPS = {"role_stats", "player_stats"}
@@ -0,0 +1,79 @@
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+class ResponseCache:
+    """ Size-bounded LRU cache of API responses, kept for the life of the container.
+        Entries expire after their route's TTL and are dropped as soon as the data
+        version they were built from changes.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()    # key -> (expires_at, version, response)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        """ Returns a copy of the cached response, or None on a miss
+            Params: key: hashable, version: the current data version for the key
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, cached_version, response = entry
+        if expires_at < time.time() or cached_version != version:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return copy_response(response)
+
+    def put(self, key, version, response, ttl):
+        """ Caches a copy of `response` for `ttl` seconds, evicting least recently used entries
+        """
+        size = response_size(response)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = (time.time() + ttl, version, copy_response(response))
+        self.size += size
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def _remove(self, key):
+        _, _, response = self.entries.pop(key)
+        self.size -= response_size(response)
+
+def copy_response(response):
+    """ Copies the parts of a response that encode_response mutates
+    """
+    copied = dict(response)
+    copied['headers'] = dict(response.get('headers') or {})
+    return copied
+
+def response_size(response):
+    return len(response.get('body') or '')
@@ -1,13 +1,29 @@
 import json
 import boto3
+import base64
+import gzip
+import hashlib
+import re
 import time
-from datetime import datetime 
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 import os
 import logging
 import urllib.request
 import urllib.parse
 import mysql.connector
-from formatter import format_match_data_by_player, format_aggregate_champion_stats
+from formatter import format_aggregate_champion_stats
+from cache import ResponseCache
+from rawjson import RawJSON, dumps, wrap_json_fields
+from static_data import get_static_data
+from quantile_sketch import SketchRanker
+from timeline_codec import response_gzip, decode_timeline_text
+from player_stats import PARTICIPANT_COLUMNS, new_totals, fold_match, merge_totals, finalize_totals
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -37,6 +53,8 @@ playerPath = '/player'
 playersPath = '/players'
 playerStatPath = '/player/stat'
 playerStatsPath = '/players/stats'
+playerStatWindowPath = '/player/stat/window'
+playerProfilePath = '/player/profile'
 matchPath = '/match'
 matchesPath = '/matches'
 matchTimelinePath = '/match/timeline'
@@ -46,11 +64,88 @@ matchHistoryPath = '/match-history'
 
 championStatsPath = '/champion-stats'
 
+staticDataPath = '/static-data'
+
+# /match-history page sizes
+MATCH_HISTORY_PAGE_SIZE = 20
+MATCH_HISTORY_MAX_PAGE_SIZE = 100
+MAX_TIMESTAMP = 2**63 - 1
+
+# Bulk listing (/players, /players/stats, /matches, /matches/timelines)
+LISTING_PAGE_SIZE = 100
+LISTING_MAX_PAGE_SIZE = 1000
+# NDJSON export stays under API Gateway's 6 MB response limit
+NDJSON_MAX_BYTES = 5 * 1024 * 1024
+NDJSON_MAX_ROWS = 50000
+NDJSON_FETCH_SIZE = 200
+
+# Multi-get (/matches?ids=, /matches/timelines?ids=); timelines run ~1 MB each
+MULTI_GET_MAX_MATCHES = 25
+MULTI_GET_MAX_TIMELINES = 5
+
+# GET routes answered with ETag/Last-Modified, mapped to the DataVersion scopes
+# whose writes can change them. The SQS workers bump a scope on every write.
+CONDITIONAL_ROUTES = {
+    playerPath: ('player',),
+    playerStatPath: ('player', 'player_stats'),
+    playerStatWindowPath: ('player', 'player_stats', 'match'),
+    matchHistoryPath: ('player', 'match'),
+    playerProfilePath: ('player', 'player_stats', 'match'),
+    championStatsPath: ('champion_stats',),
+}
+
+# Seconds a DataVersion read is trusted; bounds how stale a cached response can be
+DATA_VERSION_TTL = float(os.environ.get("DATA_VERSION_TTL", 2))
+data_versions = {}
+data_versions_read_at = 0
+
+# Per-route TTLs for the in-container response cache
+CACHE_TTLS = {
+    playerPath: 300,
+    playerStatPath: 300,
+    playerStatWindowPath: 120,
+    matchHistoryPath: 120,
+    playerProfilePath: 120,
+    championStatsPath: 600,
+}
+response_cache = ResponseCache(max_entries=256, max_bytes=32 * 1024 * 1024)
+
+# Bodies smaller than this are not worth the compression overhead
+COMPRESSION_MIN_BYTES = 1024
+
+# `fields` projection on /match and /match/timeline, e.g. "info.participants[*].challenges"
+PROJECTION_MAX_FIELDS = 20
+PROJECTION_FIELD_PATTERN = re.compile(r'^[A-Za-z0-9_]+(?:\.[A-Za-z0-9_]+|\[(?:\d+|\*)\])*$')
+PROJECTION_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_]+|\[(?:\d+|\*)\]')
+
+# Match card percentiles, ranked against the match worker's ChampionStatSketch rows.
+# Sketches only grow, so rankers are reused for SKETCH_TTL seconds per container.
+SKETCH_TTL = 300
+# Below this many games for a champion's position, rank against all its games
+SKETCH_MIN_GAMES = 20
+ALL_POSITIONS = 'ALL'
+PERCENTILE_GROUPS = {
+    'aggression_percentile': ('kda', 'dpm'),
+    'income_percentile': ('cspm', 'gold_share'),
+    'vision_percentile': ('vpm',),
+    'objective_percentile': ('odpm',),
+}
+sketch_rankers = {}
+
+# /player/stat/window: "last N games" folds N ParticipantStats rows,
+# "last N days" merges at most N PlayerStatsDay buckets
+STAT_WINDOW_MAX_GAMES = 100
+STAT_WINDOW_MAX_DAYS = 90
+
+PLAYER_STATS_JSON_FIELDS = ['topChampions', 'role', 'aggression', 'income', 'vision', 'objective']
+
 # RDS Database Environment Variables
 rds_user = os.environ['RDS_USER']
 rds_password = os.environ['RDS_PASSWORD']
 rds_host = os.environ['RDS_HOST']
 rds_port = int(os.environ.get("RDS_PORT", 3306))
+# Seconds before a warm connection is recycled, kept under RDS wait_timeout
+rds_conn_max_age = int(os.environ.get("RDS_CONN_MAX_AGE", 300))
 
 STATS_HEADERS = {
     "X-Riot-Token": os.environ.get("RIOT_API_KEY"),
@@ -59,22 +154,39 @@ STATS_HEADERS = {
     "Origin": "https://developer.riotgames.com"
 }
 
-# Warm lambda connection
+# Warm lambda connection, reused by every invocation this container serves
 conn = None
-cursor = None
+conn_opened_at = 0
+
+# Routes that only enqueue SQS messages or answer locally never touch RDS
+NO_DB_ROUTES = {
+    (healthPath, getMethod),
+    (staticDataPath, getMethod),
+    (playerPath, postMethod),
+    (playerStatPath, postMethod),
+    (matchPath, postMethod),
+    (matchTimelinePath, postMethod),
+}
 
 def lambda_handler(event, context):
+    response = route_request(event)
+    return encode_response(response, get_header(event, 'Accept-Encoding'))
+
+def route_request(event):
     logging.info(f"Received event path: {event.get('path')}, HTTP method: {event.get('httpMethod')}")
     logging.info(event)
     httpMethod = event.get('httpMethod')
     path = event.get('path')
 
-    conn = get_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    #get_all_aggregate_champion_stats(conn, cursor)
-    # Safely parse JSON body if it exists
+    # The API treats every media type as binary, so request bodies arrive base64 encoded
+    if event.get('isBase64Encoded') and event.get('body'):
+        event['body'] = base64.b64decode(event['body']).decode('utf-8')
+        event['isBase64Encoded'] = False
+
+    conn = None
+    cursor = None
     try:
+        # Safely parse JSON body if it exists
         body = event.get('body')
         if body:
             try:
@@ -86,95 +198,169 @@ def lambda_handler(event, context):
         else:
             data = {}
 
-        # Routing
-        if path == healthPath and httpMethod == getMethod:
-            httpResponse = buildResponse(200, "Healthy")
-
-        # Player Routes
-        elif path == playerPath:
-            if httpMethod == getMethod:
-                return get_player(event, conn, cursor)
-            if httpMethod == postMethod:
-                return handle_player_request(json.loads(event['body']))
-            if httpMethod == patchMethod:
-                return updatePlayer()
-            elif httpMethod == deleteMethod:
-                res = delete_player(json.loads(event['body']), conn=conn, cursor=cursor)
-                return res
-        
-        # Players 
-        elif path == playersPath and httpMethod == getMethod:
-            return get_players(conn, cursor)
-        
-        # All Players Stats'
-        elif path == playerStatsPath:
-            if httpMethod == getMethod:
-                return get_all_player_stats(conn, cursor)
-        
-        # Player Stat
-        elif path == playerStatPath:
-            if httpMethod == getMethod:
-                return get_player_stats(event, conn, cursor)
-            elif httpMethod == postMethod:
-                res = add_player_stats(json.loads(event['body']))
-                logger.info(f"Add Player Stats return: {res}")
-                return res
-
-        # Match 
-        elif path == matchPath:
-            if httpMethod == postMethod:
-                res = add_match(json.loads(event['body']))
-                logging.info(f"Add match ids: {res}")
-                return res
-            elif httpMethod == getMethod:
-                return get_match(event, conn, cursor)
-
-        # All matches
-        elif path == matchesPath and httpMethod == getMethod:
-            return get_all_matches(conn, cursor)
-
-        # All match data by Player --  /match-history?gameName=melon&tagLine=23333
-        elif path == matchHistoryPath and httpMethod == getMethod:
-            return get_match_data_by_player(conn, cursor, event)
-
-        # Match timeline
-        elif path == matchTimelinePath:
-            if httpMethod == getMethod:
-                return get_match_timeline(event, conn, cursor)
-            elif httpMethod == postMethod:
-                res = add_match_timeline(json.loads(event['body']))
-                return res
-        
-        # All match timelines
-        elif path == matchTimelinesPath and httpMethod == getMethod:
-            return get_all_match_timelines(conn, cursor, event)
-        
-        # All champion stats 
-        elif path == championStatsPath and httpMethod == getMethod:
-            return get_all_aggregate_champion_stats(conn, cursor)
-
-        else:
-            return buildResponse(404, {"error": "Not found"})
+        # Conditional GET and response cache: answer before running the query
+        # when the data behind this route hasn't changed
+        validator = None
+        cache_key = None
+        if httpMethod == getMethod and path in CONDITIONAL_ROUTES:
+            validator = get_validator(event, CONDITIONAL_ROUTES[path])
+            if validator and is_not_modified(event, validator):
+                return buildNotModifiedResponse(validator)
+            if validator and path in CACHE_TTLS:
+                params = event.get('queryStringParameters') or {}
+                cache_key = (path, tuple(sorted(params.items())))
+                # The ETag already covers the path, query and data versions
+                cached = response_cache.get(cache_key, validator[0])
+                logger.info(f"Response cache {'hit' if cached else 'miss'} for {path}: {response_cache.stats()}")
+                if cached:
+                    cached['headers']['X-Cache'] = 'HIT'
+                    return cached
+
+        if (path, httpMethod) not in NO_DB_ROUTES:
+            conn = get_connection()
+            cursor = conn.cursor(dictionary=True)
+
+        response = dispatch_request(event, path, httpMethod, conn, cursor)
+        if validator and response and response['statusCode'] == 200:
+            add_validator_headers(response, validator)
+            if cache_key:
+                response_cache.put(cache_key, validator[0], response, CACHE_TTLS[path])
+                response['headers']['X-Cache'] = 'MISS'
+        return response
 
     except json.JSONDecodeError as e:
         logging.error(f"Failed to parse JSON body: {body}")
         return buildResponse(400, {"error": "Invalid JSON in request body"})
     finally:
+        # The connection stays open for the next invocation
         if cursor:
             cursor.close()
-        if conn:
-            conn.close()
+
+def dispatch_request(event, path, httpMethod, conn, cursor):
+    # Routing
+    if path == healthPath and httpMethod == getMethod:
+        return buildResponse(200, "Healthy")
+
+    # Player Routes
+    elif path == playerPath:
+        if httpMethod == getMethod:
+            return get_player(event, conn, cursor)
+        if httpMethod == postMethod:
+            return handle_player_request(json.loads(event['body']))
+        if httpMethod == patchMethod:
+            return updatePlayer()
+        elif httpMethod == deleteMethod:
+            res = delete_player(json.loads(event['body']), conn=conn, cursor=cursor)
+            return res
+    
+    # Player profile: player, stats and first match history page in one request
+    elif path == playerProfilePath and httpMethod == getMethod:
+        return get_player_profile(event, conn, cursor)
+
+    # Players 
+    elif path == playersPath and httpMethod == getMethod:
+        return get_players(conn, cursor, event)
+    
+    # All Players Stats'
+    elif path == playerStatsPath:
+        if httpMethod == getMethod:
+            return get_all_player_stats(conn, cursor, event)
+    
+    # Player Stat
+    elif path == playerStatPath:
+        if httpMethod == getMethod:
+            return get_player_stats(event, conn, cursor)
+        elif httpMethod == postMethod:
+            res = add_player_stats(json.loads(event['body']))
+            logger.info(f"Add Player Stats return: {res}")
+            return res
+
+    # Player Stat over recent games or days -- /player/stat/window?gameName=melon&tagLine=23333&games=10
+    elif path == playerStatWindowPath and httpMethod == getMethod:
+        return get_player_stats_window(event, conn, cursor)
+
+    # Match 
+    elif path == matchPath:
+        if httpMethod == postMethod:
+            res = add_match(json.loads(event['body']))
+            logging.info(f"Add match ids: {res}")
+            return res
+        elif httpMethod == getMethod:
+            return get_match(event, conn, cursor)
+
+    # All matches
+    elif path == matchesPath and httpMethod == getMethod:
+        return get_all_matches(conn, cursor, event)
+
+    # All match data by Player --  /match-history?gameName=melon&tagLine=23333
+    elif path == matchHistoryPath and httpMethod == getMethod:
+        return get_match_data_by_player(conn, cursor, event)
+
+    # Match timeline
+    elif path == matchTimelinePath:
+        if httpMethod == getMethod:
+            return get_match_timeline(event, conn, cursor)
+        elif httpMethod == postMethod:
+            res = add_match_timeline(json.loads(event['body']))
+            return res
+    
+    # All match timelines
+    elif path == matchTimelinesPath and httpMethod == getMethod:
+        return get_all_match_timelines(conn, cursor, event)
+    
+    # All champion stats 
+    elif path == championStatsPath and httpMethod == getMethod:
+        return get_all_aggregate_champion_stats(conn, cursor)
+
+    # Champion, item, rune and spell names from the bundled Data Dragon snapshot
+    elif path == staticDataPath and httpMethod == getMethod:
+        return get_static_data_snapshot(event)
+
+    else:
+        return buildResponse(404, {"error": "Not found"})
 
 def get_connection():
-    return mysql.connector.connect(
+    """ Returns the container's warm connection, opening a new one when there is
+        none, it is older than RDS_CONN_MAX_AGE, or it fails a ping
+    """
+    global conn, conn_opened_at
+
+    if conn is not None and time.time() - conn_opened_at > rds_conn_max_age:
+        logger.info("Recycling RDS connection after max lifetime")
+        close_connection()
+
+    if conn is not None:
+        try:
+            conn.ping(reconnect=True, attempts=1, delay=0)
+            return conn
+        except mysql.connector.Error:
+            logger.warning("Warm RDS connection failed ping, reconnecting")
+            close_connection()
+
+    conn = mysql.connector.connect(
         host=rds_host,
         user=rds_user,
         password=rds_password,
         port=rds_port,
         database="rift_rewind",
         charset='utf8mb4',
-        use_unicode=True
+        use_unicode=True,
+        # Each read sees the latest committed data instead of a snapshot
+        # held open from a previous invocation
+        autocommit=True
     )
+    conn_opened_at = time.time()
+    return conn
+
+def close_connection():
+    global conn
+    try:
+        if conn is not None:
+            conn.close()
+    except mysql.connector.Error:
+        logger.warning("Failed to close RDS connection cleanly")
+    finally:
+        conn = None
 
 # ----------- GET requests -----------
 def get_player(event, conn, cursor):
@@ -186,9 +372,7 @@ def get_player(event, conn, cursor):
         if not gameName or not tagLine:
             return buildResponse(400, {"error": "Missing gameName or tagLine"})
 
-        query = "SELECT * FROM Player WHERE gameName=%s and tagLine=%s"
-        cursor.execute(query, (gameName, tagLine))
-        player = cursor.fetchone()
+        player = fetch_player(cursor, gameName, tagLine)
 
         if not player:
             return buildResponse(404, {"message": "Player not found"})
@@ -204,33 +388,144 @@ def get_player_stats(event, conn, cursor):
     if not gameName or not tagLine:
         return buildResponse(400, {"error": "Missing gameName or tagLine"})
     try:
-        fields_to_parse = ['topChampions', 'role', 'aggression', 'income', 'vision', 'objective']
-
-        cursor.execute(
-            """ SELECT * 
-                FROM PlayerStats 
-                WHERE puuid = (
-                    SELECT puuid 
-                    FROM Player 
-                    WHERE gameName = %s AND tagLine = %s
-                )""",
-                (gameName, tagLine, )
-        )
-        res = cursor.fetchone()
+        puuid = resolve_puuid(cursor, gameName, tagLine)
+        res = fetch_player_stats(cursor, puuid) if puuid else None
         if not res:
             return buildResponse(404, {"message": "Player stats not found"})
-        
-        for field in fields_to_parse:
-            if field in res and res[field]:
-                try:
-                    res[field] = json.loads(res[field])
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse field '{field}': {e}")
         return buildResponse(200, res)
     except Exception as e:
         logger.exception("failed to get player stats from database")
         return buildResponse(500, {"error": str(e)})
 
+def get_player_stats_window(event, conn, cursor):
+    """ Returns the PlayerStats fields over a player's recent games or days
+        Params: gameName, tagLine, and either games (e.g. 10, 20) or days (e.g. 7, 30)
+        Return: { puuid, window: {games|days: n}, games, role, topChampions, winrate, aggression, income, vision, objective }
+    """
+    params = event.get('queryStringParameters') or {}
+    gameName = params.get('gameName')
+    tagLine = params.get('tagLine')
+    if not gameName or not tagLine:
+        return buildResponse(400, {"error": "Missing gameName or tagLine"})
+    try:
+        window = parse_stats_window(params)
+    except ValueError as e:
+        return buildResponse(400, {"error": str(e)})
+
+    try:
+        puuid = resolve_puuid(cursor, gameName, tagLine)
+        if not puuid:
+            return buildResponse(404, {"message": "Player not found"})
+        if 'games' in window:
+            totals = fetch_recent_games_totals(cursor, puuid, window['games'])
+        else:
+            totals = fetch_recent_days_totals(cursor, puuid, window['days'])
+        return buildResponse(200, {"puuid": puuid, "window": window, "games": totals["games"], **finalize_totals(totals)})
+    except Exception as e:
+        logger.exception("failed to get player stats window from database")
+        return buildResponse(500, {"error": str(e)})
+
+def parse_stats_window(params):
+    """ Returns {"games": n} or {"days": n} from exactly one of the `games`/`days` parameters
+    """
+    games = params.get('games')
+    days = params.get('days')
+    if bool(games) == bool(days):
+        raise ValueError("Specify exactly one of games or days")
+    name, value, maximum = ('games', games, STAT_WINDOW_MAX_GAMES) if games else ('days', days, STAT_WINDOW_MAX_DAYS)
+    if not value.isdigit() or not 1 <= int(value) <= maximum:
+        raise ValueError(f"{name} must be an integer between 1 and {maximum}")
+    return {name: int(value)}
+
+def fetch_recent_games_totals(cursor, puuid, games):
+    """ Folds the player's `games` most recent ParticipantStats rows, read from idx_participant_puuid
+    """
+    cursor.execute(
+        f""" SELECT {PARTICIPANT_COLUMNS}
+             FROM ParticipantStats
+             WHERE puuid = %s
+             ORDER BY gameStartTimestamp DESC
+             LIMIT %s
+        """, (puuid, games))
+    totals = new_totals()
+    for row in cursor.fetchall():
+        fold_match(totals, row)
+    return totals
+
+def fetch_recent_days_totals(cursor, puuid, days):
+    """ Merges the player's PlayerStatsDay buckets for the last `days` UTC days, today included
+    """
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    cursor.execute("SELECT totals FROM PlayerStatsDay WHERE puuid = %s AND day >= %s", (puuid, since))
+    totals = new_totals()
+    for row in cursor.fetchall():
+        merge_totals(totals, json.loads(row['totals']))
+    return totals
+
+def get_player_profile(event, conn, cursor):
+    """ Returns everything the profile page needs in one round trip
+        Params: gameName, tagLine, optional limit for the match history page
+        Return: { player, stats, matchHistory: { matches, nextCursor } }
+    """
+    try:
+        params = event.get('queryStringParameters') or {}
+        gameName = params.get('gameName')
+        tagLine = params.get('tagLine')
+        if not gameName or not tagLine:
+            return buildResponse(400, {"error": "Missing gameName or tagLine"})
+
+        try:
+            limit = parse_limit(params, default=MATCH_HISTORY_PAGE_SIZE, maximum=MATCH_HISTORY_MAX_PAGE_SIZE)
+        except ValueError as e:
+            return buildResponse(400, {"error": str(e)})
+
+        # The Player row carries the puuid, so it doubles as the Riot ID lookup
+        player = fetch_player(cursor, gameName, tagLine)
+        if not player:
+            return buildResponse(404, {"message": "Player not found"})
+
+        puuid = player['puuid']
+        stats = fetch_player_stats(cursor, puuid)
+        matches, next_cursor = fetch_match_history(cursor, puuid, limit, MAX_TIMESTAMP, '')
+        return buildResponse(200, {
+            "player": player,
+            "stats": stats,
+            "matchHistory": {"matches": matches, "nextCursor": next_cursor}
+        })
+    except Exception as e:
+        logger.exception("failed to get player profile from database")
+        return buildResponse(500, {"error": str(e)})
+
+def get_static_data_snapshot(event):
+    """ Returns the static-data snapshot for a patch (`version`, e.g. "15.22"), else the newest
+        { version, champions: { key: [id, name] }, spells, runes, items: { id: name } }
+    """
+    try:
+        params = event.get('queryStringParameters') or {}
+        static_data = get_static_data(params.get('version'))
+        response = buildResponse(200, RawJSON(static_data.text))
+        # A snapshot never changes once bundled
+        response['headers']['Cache-Control'] = 'public, max-age=86400'
+        return response
+    except Exception as e:
+        logger.exception("failed to load static data")
+        return buildResponse(500, {"error": str(e)})
+
+def fetch_player(cursor, gameName, tagLine):
+    """ Returns the Player row for a Riot ID, or None
+    """
+    cursor.execute("SELECT * FROM Player WHERE gameName=%s and tagLine=%s", (gameName, tagLine))
+    return cursor.fetchone()
+
+def fetch_player_stats(cursor, puuid):
+    """ Returns the PlayerStats row for a puuid with its JSON columns marked raw, or None
+    """
+    cursor.execute("SELECT * FROM PlayerStats WHERE puuid = %s", (puuid,))
+    row = cursor.fetchone()
+    if row:
+        wrap_json_fields(row, PLAYER_STATS_JSON_FIELDS)
+    return row
+
 def get_match(event, conn, cursor):
     try:
         params = event.get('queryStringParameters') or {}
@@ -239,6 +534,9 @@ def get_match(event, conn, cursor):
         if not matchId:
             return buildResponse(400, {"error": "Missing matchId"})
 
+        if params.get('fields') or params.get('puuid'):
+            return get_match_projection(cursor, 'MatchData', 'matchData', matchId, params)
+
         query = "SELECT * FROM MatchData WHERE matchId=%s"
         cursor.execute(query, (matchId,))
         match = cursor.fetchone()
@@ -246,12 +544,8 @@ def get_match(event, conn, cursor):
         if not match:
             return buildResponse(404, {"message": "Match not found"})
 
-        if 'matchData' in match and match['matchData']:
-            try:
-                match['matchData'] = json.loads(match['matchData'])
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse matchData JSON: {e}")
-                # leave as string if parsing fails
+        # Ship the stored document as-is rather than decoding and re-encoding it
+        wrap_json_fields(match, ['matchData'])
         return buildResponse(200, match)
     except Exception as e:
         logger.exception("failed to get matches from database")
@@ -266,33 +560,181 @@ def get_match_timeline(event, conn, cursor):
         if not matchId:
             return buildResponse(400, {"error": "Missing matchId"})
 
-        # Fetch timeline from DB
-        query = "SELECT * FROM MatchTimeline WHERE matchId=%s"
-        cursor.execute(query, (matchId,))
-        row = cursor.fetchone()
+        if params.get('fields') or params.get('puuid'):
+            return get_timeline_projection(cursor, matchId, params)
 
+        cursor.execute("SELECT timeline FROM CompressedMatchTimeline WHERE matchId = %s", (matchId,))
+        row = cursor.fetchone()
         if not row:
             return buildResponse(404, {"message": "Match timeline not found"})
-
-        # Parse JSON if available
-        if 'matchTimeline' in row and row['matchTimeline']:
-            try:
-                row['matchTimeline'] = json.loads(row['matchTimeline'])
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse timeline JSON: {e}")
-                # leave as string if parsing fails
-
-        # Return full JSON
-        return buildResponse(200, row)
+        return build_timeline_response(matchId, row['timeline'], get_header(event, 'Accept-Encoding'))
 
     except Exception as e:
         logger.exception("Failed to get match timelines from database")
         return buildResponse(500, {"error": str(e)})
 
+def build_timeline_response(match_id, blob, accept_encoding):
+    """ Returns {matchId, matchTimeline} for a compressed timeline. The stored gzip member
+        is the whole response body, so gzip clients get it as-is and others get it
+        decompressed once; the timeline is never re-encoded.
+    """
+    member = response_gzip(blob)
+    if member is None:
+        # Stored without the body around it
+        return buildResponse(200, {"matchId": match_id, "matchTimeline": RawJSON(decode_timeline_text(blob))})
+
+    response = buildResponse(200)
+    if choose_encoding(accept_encoding, available=('gzip',)) != 'gzip':
+        response['body'] = gzip.decompress(member).decode('utf-8')
+        return response
+    response['body'] = base64.b64encode(member).decode('ascii')
+    response['isBase64Encoded'] = True
+    response['headers']['Content-Encoding'] = 'gzip'
+    response['headers']['Vary'] = 'Accept-Encoding'
+    return response
+
+def get_timeline_projection(cursor, matchId, params):
+    """ Returns the requested fragments of a timeline, decompressed and projected here
+        Return: {matchId, fields: {path: value}}
+    """
+    try:
+        fields = parse_projection_fields(params.get('fields'))
+    except ValueError as e:
+        return buildResponse(400, {"error": str(e)})
+    if params.get('puuid'):
+        return buildResponse(400, {"error": "puuid projection is only supported on /match"})
+
+    cursor.execute("SELECT timeline FROM CompressedMatchTimeline WHERE matchId = %s", (matchId,))
+    row = cursor.fetchone()
+    if not row:
+        return buildResponse(404, {"message": "Match timeline not found"})
+
+    timeline = json.loads(decode_timeline_text(row['timeline']))
+    return buildResponse(200, {
+        "matchId": matchId,
+        "fields": {field: extract_json_path(timeline, field) for field in fields}
+    })
+
+def extract_json_path(document, field):
+    """ Resolves a validated dotted path against a parsed document the way JSON_EXTRACT does:
+        a path with [*] returns every match as a list, any other returns the value;
+        null when nothing matches
+    """
+    values = [document]
+    wildcard = False
+    for token in PROJECTION_TOKEN_PATTERN.findall(field):
+        matches = []
+        for value in values:
+            if token == '[*]':
+                wildcard = True
+                if isinstance(value, list):
+                    matches.extend(value)
+            elif token.startswith('['):
+                index = int(token[1:-1])
+                if isinstance(value, list) and index < len(value):
+                    matches.append(value[index])
+            elif isinstance(value, dict) and token in value:
+                matches.append(value[token])
+        values = matches
+    if wildcard:
+        return values or None
+    return values[0] if values else None
+
+def get_match_projection(cursor, table, column, matchId, params):
+    """ Returns only the requested fragments of a stored Riot document, extracted in MySQL
+        Params: table/column: the stored JSON document, MatchData.matchData
+                params: `fields` comma-separated paths, `puuid` (matches only) to select one participant
+        Return: {matchId, [puuid], fields: {path: value}} or, for a bare puuid, {matchId, puuid, participant}
+    """
+    try:
+        fields = parse_projection_fields(params.get('fields'))
+    except ValueError as e:
+        return buildResponse(400, {"error": str(e)})
+
+    puuid = params.get('puuid')
+    if puuid and table != 'MatchData':
+        return buildResponse(400, {"error": "puuid projection is only supported on /match"})
+
+    if puuid:
+        # Locate the participant once, then resolve each field relative to it.
+        # JSON_SEARCH uses LIKE matching, so escape the wildcards a puuid can contain.
+        relative_paths = [to_json_path(field, root='') for field in fields] or ['']
+        extracts = ", ".join(
+            f"JSON_EXTRACT(p.doc, CONCAT(p.participantPath, %s)) AS f{idx}"
+            for idx in range(len(relative_paths))
+        )
+        query = f""" SELECT p.matchId, p.participantPath, {extracts}
+                     FROM (
+                        SELECT matchId, {column} AS doc,
+                               SUBSTRING_INDEX(
+                                   JSON_UNQUOTE(JSON_SEARCH({column}, 'one', %s, NULL, '$.info.participants[*].puuid')),
+                                   '.puuid', 1) AS participantPath
+                        FROM {table}
+                        WHERE matchId = %s
+                     ) p """
+        escaped_puuid = puuid.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        cursor.execute(query, (*relative_paths, escaped_puuid, matchId))
+    else:
+        extracts = ", ".join(
+            f"JSON_EXTRACT({column}, %s) AS f{idx}" for idx in range(len(fields))
+        )
+        query = f"SELECT matchId, {extracts} FROM {table} WHERE matchId = %s"
+        cursor.execute(query, (*[to_json_path(field) for field in fields], matchId))
+
+    row = cursor.fetchone()
+    if not row:
+        return buildResponse(404, {"message": "Match not found"})
+
+    body = {"matchId": row['matchId']}
+    if puuid:
+        if not row['participantPath']:
+            return buildResponse(404, {"message": "Participant not found"})
+        body['puuid'] = puuid
+        if not fields:
+            body['participant'] = json_value(row['f0'])
+            return buildResponse(200, body)
+
+    body['fields'] = {
+        field: json_value(row[f"f{idx}"]) for idx, field in enumerate(fields)
+    }
+    return buildResponse(200, body)
+
+def parse_projection_fields(fields_param):
+    """ Parses the `fields` query parameter into a de-duplicated list of dotted paths
+        Params: fields_param: e.g. "metadata.participants,info.participants[*].challenges"
+    """
+    if not fields_param:
+        return []
+    fields = []
+    for field in fields_param.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if not PROJECTION_FIELD_PATTERN.match(field):
+            raise ValueError(f"Invalid field path: {field}")
+        fields.append(field)
+    if len(fields) > PROJECTION_MAX_FIELDS:
+        raise ValueError(f"At most {PROJECTION_MAX_FIELDS} fields can be requested")
+    return fields
+
+def to_json_path(field, root='$'):
+    """ Converts a validated dotted path into a MySQL JSON path, quoting every key
+        so numeric keys such as participantFrames."1" resolve
+    """
+    path = root
+    for token in PROJECTION_TOKEN_PATTERN.findall(field):
+        path += token if token.startswith('[') else f'."{token}"'
+    return path
+
+def json_value(value):
+    """ Wraps a JSON_EXTRACT result for splicing; SQL NULL (missing path) becomes null
+    """
+    return None if value is None else RawJSON(value)
+
 def get_match_data_by_player(conn, cursor, event):
     try:
         # Extract query parameters safely
-        params = event.get('queryStringParameters', {})
+        params = event.get('queryStringParameters') or {}
         gameName = params.get('gameName')
         tagLine = params.get('tagLine')
 
@@ -300,145 +742,303 @@ def get_match_data_by_player(conn, cursor, event):
             logger.error("Missing gameName or tagLine")
             return buildResponse(400, {"error": "Missing gameName or tagLine"})
 
-        query = """ SELECT 
-                        md.matchId,
-                        CAST(JSON_UNQUOTE(JSON_EXTRACT(md.matchData, '$.info.gameStartTimestamp')) AS UNSIGNED) AS gameStartTimestamp,
-                        CAST(JSON_UNQUOTE(JSON_EXTRACT(md.matchData, '$.info.gameDuration')) AS UNSIGNED) AS gameDuration,
-                        GROUP_CONCAT(pt.summonerName) AS summonerNames,
-                        GROUP_CONCAT(pt.championName) AS championNames,
-                        GROUP_CONCAT(CAST(pt.win AS UNSIGNED)) AS outcomes,
-                        GROUP_CONCAT(pt.lane) AS lanes,
-                        GROUP_CONCAT(pt.role) AS roles,
-                        GROUP_CONCAT(pt.summoner1Id) AS summonerSpells1,
-                        GROUP_CONCAT(pt.summoner2Id) AS summonerSpells2,
-                        JSON_ARRAYAGG(JSON_EXTRACT(pt.perks, '$.styles[0].style')) AS primaryStyles,
-                        JSON_ARRAYAGG(JSON_EXTRACT(pt.perks, '$.styles[0].selections[0].perk')) AS primaryKeystones,
-                        JSON_ARRAYAGG(JSON_EXTRACT(pt.perks, '$.styles[1].style')) AS secondaryStyles,
-
-                        GROUP_CONCAT(pt.kills) AS kills,
-                        GROUP_CONCAT(pt.deaths) AS deaths,
-                        GROUP_CONCAT(pt.assists) AS assists,
-                        GROUP_CONCAT(pt.kda) AS kda,
-
-                        GROUP_CONCAT(pt.item0) AS item0,
-                        GROUP_CONCAT(pt.item1) AS item1,
-                        GROUP_CONCAT(pt.item2) AS item2,
-                        GROUP_CONCAT(pt.item3) AS item3,
-                        GROUP_CONCAT(pt.item4) AS item4,
-                        GROUP_CONCAT(pt.item5) AS item5,
-                        GROUP_CONCAT(pt.item6) AS item6,
-
-                        GROUP_CONCAT(pt.teamId) AS teamIds
-
-                    FROM MatchData md
-                    JOIN JSON_TABLE(
-                        md.matchData, 
-                        '$.info.participants[*]' COLUMNS (
-                            puuid VARCHAR(255) PATH '$.puuid',
-                            summonerName VARCHAR(255) PATH '$.riotIdGameName',
-                            riotIdTagline VARCHAR(10) PATH '$.riotIdTagline',
-                            win BOOLEAN PATH '$.win',
-                            championName VARCHAR(100) PATH '$.championName',
-                            lane VARCHAR(20) PATH '$.lane',
-                            role VARCHAR(20) PATH '$.role',
-                            summoner1Id INT PATH '$.summoner1Id',
-                            summoner2Id INT PATH '$.summoner2Id',
-                            perks JSON PATH '$.perks',
-                            kills INT PATH '$.kills',
-                            deaths INT PATH '$.deaths',
-                            assists INT PATH '$.assists',
-                            kda FLOAT PATH '$.challenges.kda',
-                            item0 INT PATH '$.item0',
-                            item1 INT PATH '$.item1',
-                            item2 INT PATH '$.item2',
-                            item3 INT PATH '$.item3',
-                            item4 INT PATH '$.item4',
-                            item5 INT PATH '$.item5',
-                            item6 INT PATH '$.item6',
-                            teamId INT PATH '$.teamId'
-                        )
-                    ) AS pt
-                    WHERE md.matchId IN (
-                        SELECT md2.matchId
-                        FROM MatchData md2
-                        JOIN JSON_TABLE(
-                            md2.matchData,
-                            '$.info.participants[*]' COLUMNS (
-                                summonerName VARCHAR(255) PATH '$.riotIdGameName',
-                                riotIdTagline VARCHAR(10) PATH '$.riotIdTagline'
-                            )
-                        ) AS p
-                        WHERE p.summonerName = %s AND p.riotIdTagline = %s
-                    )
-                    GROUP BY md.matchId, gameStartTimestamp, gameDuration;
-            """
-        cursor.execute(query, (gameName, tagLine))
-        rows = cursor.fetchall()  
+        try:
+            limit = parse_limit(params, default=MATCH_HISTORY_PAGE_SIZE, maximum=MATCH_HISTORY_MAX_PAGE_SIZE)
+            before_timestamp, before_match_id = parse_match_history_cursor(params.get('before'))
+        except ValueError as e:
+            return buildResponse(400, {"error": str(e)})
 
-        # Transform data to be more readable
-        if rows:
-            logger.info(f"{len(rows)} matches retrieved for {gameName}#{tagLine}")
-            columns = [col[0] for col in cursor.description]
-            logger.info(f"First row: {rows[0]}")
-            result = format_match_data_by_player(rows, columns)
-            return buildResponse(200, result)
-        else:
-            logger.info(f"No match data found for {gameName}#{tagLine}")
-            return buildResponse(200, [])
+        puuid = resolve_puuid(cursor, gameName, tagLine)
+        if not puuid:
+            logger.info(f"No puuid found for {gameName}#{tagLine}")
+            return buildResponse(200, {"matches": {}, "nextCursor": None})
+
+        matches, next_cursor = fetch_match_history(cursor, puuid, limit, before_timestamp, before_match_id)
+        logger.info(f"{len(matches)} matches retrieved for {gameName}#{tagLine}")
+        return buildResponse(200, {"matches": matches, "nextCursor": next_cursor})
 
     except Exception as e:
         logger.exception(f"Failed to get match data from database for {gameName}#{tagLine}")
         return buildResponse(500, {"error": str(e)})
 
-def get_players(conn, cursor):
+def fetch_match_history(cursor, puuid, limit, before_timestamp, before_match_id):
+    """ Returns one page of a player's match cards, newest first. Cards are rendered
+        once by the match worker at ingest; only their percentiles are filled in here.
+        Params: before_timestamp/before_match_id: keyset position of the previous page's oldest match
+        Return: (cards keyed by matchId, nextCursor or None)
+    """
+    query = """ SELECT pm.matchId, pm.gameStartTimestamp, mc.card
+                FROM (
+                    -- Only the requested page, newest first, read from the PlayerMatch index
+                    SELECT matchId, gameStartTimestamp
+                    FROM PlayerMatch
+                    WHERE puuid = %s
+                      AND (gameStartTimestamp < %s
+                           OR (gameStartTimestamp = %s AND matchId < %s))
+                    ORDER BY gameStartTimestamp DESC, matchId DESC
+                    LIMIT %s
+                ) AS pm
+                LEFT JOIN MatchCard mc ON mc.matchId = pm.matchId
+                ORDER BY pm.gameStartTimestamp DESC, pm.matchId DESC
+        """
+    cursor.execute(query, (puuid, before_timestamp, before_timestamp, before_match_id, limit))
+    rows = cursor.fetchall()
+    if not rows:
+        return {}, None
+
+    matches = {}
+    for row in rows:
+        if not row['card']:
+            # Indexed before cards existed; the match worker's backfill_match_index renders it
+            logger.warning(f"No match card for matchID: {row['matchId']}")
+            continue
+        matches[row['matchId']] = json.loads(row['card'])
+    fill_percentiles(cursor, matches.values())
+
+    # A full page may have more behind it; continue from its oldest match
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = f"{last['gameStartTimestamp']}_{last['matchId']}"
+    return matches, next_cursor
+
+def fill_percentiles(cursor, cards):
+    """ Sets each participant's PERCENTILE_GROUPS, e.g. "aggression_percentile": {"kda": 0.82, "dpm": 0.64},
+        ranking their card metrics against their champion's games in the same position
+    """
+    participants = [p for card in cards for p in card.get('participants', [])]
+    keys = set()
+    for p in participants:
+        if p.get('metrics'):
+            keys.add((p['championId'], p.get('teamPosition') or ''))
+            keys.add((p['championId'], ALL_POSITIONS))
+    rankers = load_sketch_rankers(cursor, keys)
+
+    for p in participants:
+        metrics = p.get('metrics') or {}
+        by_position = rankers.get((p.get('championId'), p.get('teamPosition') or ''), {})
+        by_champion = rankers.get((p.get('championId'), ALL_POSITIONS), {})
+        for group, names in PERCENTILE_GROUPS.items():
+            percentiles = {}
+            for name in names:
+                ranker = by_position.get(name)
+                if ranker is None or ranker.count < SKETCH_MIN_GAMES:
+                    ranker = by_champion.get(name)
+                rank = ranker.rank(metrics.get(name)) if ranker else None
+                if rank is not None:
+                    percentiles[name] = round(rank, 3)
+            p[group] = percentiles
+
+def load_sketch_rankers(cursor, keys):
+    """ Returns {(championId, teamPosition): {metric: SketchRanker}} for `keys`,
+        reading only the rows missing from (or expired in) the container cache
+    """
+    now = time.time()
+    stale = [key for key in keys if key not in sketch_rankers or now - sketch_rankers[key][0] > SKETCH_TTL]
+    if stale:
+        placeholders = ", ".join(["(%s, %s)"] * len(stale))
+        cursor.execute(
+            f""" SELECT championId, teamPosition, sketches
+                 FROM ChampionStatSketch
+                 WHERE (championId, teamPosition) IN ({placeholders})
+            """,
+            tuple(value for key in stale for value in key)
+        )
+        loaded = {}
+        for row in cursor.fetchall():
+            sketches = json.loads(row['sketches'])
+            loaded[(row['championId'], row['teamPosition'])] = {
+                name: SketchRanker(sketch) for name, sketch in sketches.items()
+            }
+        for key in stale:
+            sketch_rankers[key] = (now, loaded.get(key, {}))
+    return {key: sketch_rankers[key][1] for key in keys}
+
+def parse_limit(params, default, maximum):
+    """ Returns the `limit` query parameter clamped to [1, maximum]
+    """
+    limit = params.get('limit')
+    if limit is None or limit == '':
+        return default
     try:
-        cursor.execute("SELECT * FROM Player")
-        players = cursor.fetchall()
-        return buildResponse(200, players)
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, maximum))
+
+def parse_match_history_cursor(cursor_param):
+    """ Parses a /match-history `before` cursor of the form "<gameStartTimestamp>_<matchId>"
+        Return: (gameStartTimestamp, matchId); with no cursor, a key newer than any match
+    """
+    if not cursor_param:
+        return MAX_TIMESTAMP, ''
+    timestamp, _, match_id = cursor_param.partition('_')
+    if not (timestamp.isascii() and timestamp.isdigit()) or not match_id or int(timestamp) > MAX_TIMESTAMP:
+        raise ValueError("Invalid before cursor")
+    return int(timestamp), match_id
+
+def resolve_puuid(cursor, gameName, tagLine):
+    """ Returns the puuid for a Riot ID, or None if it has never been seen
+        Looks up RiotAccount (maintained at match ingest), then the Player table
+    """
+    cursor.execute(
+        "SELECT puuid FROM RiotAccount WHERE gameName = %s AND tagLine = %s",
+        (gameName, tagLine)
+    )
+    row = cursor.fetchone()
+    if not row:
+        cursor.execute(
+            "SELECT puuid FROM Player WHERE gameName = %s AND tagLine = %s",
+            (gameName, tagLine)
+        )
+        row = cursor.fetchone()
+    return row['puuid'] if row else None
+
+def get_players(conn, cursor, event):
+    """ Returns a page of Player rows ordered by puuid
+    """
+    try:
+        return list_table(conn, cursor, event, "Player", "puuid", "players")
     except Exception as e:
         logger.exception("failed to get players from database")
         return buildResponse(500, {"error": str(e)})
 
-def get_all_player_stats(conn, cursor):
+def get_all_player_stats(conn, cursor, event):
+    """ Returns a page of PlayerStats rows ordered by puuid
+    """
     try:
-        cursor.execute("SELECT * FROM PlayerStats")
-        player_stats = cursor.fetchall()
-        json_fields = ['topChampions', 'role', 'aggression', 'income', 'vision', 'objective']
-
-        for record in player_stats:
-            for field in json_fields:
-                if field in record and record[field]:
-                    try:
-                        record[field] = json.loads(record[field])
-                    except json.JSONDecodeError as e:
-                        logger.warning(f"Failed to parse field '{field}' in player {record.get('puuid')}: {e}")
-        return buildResponse(200, player_stats)
+        return list_table(conn, cursor, event, "PlayerStats", "puuid", "playerStats",
+                          json_fields=PLAYER_STATS_JSON_FIELDS)
     except Exception as e:
         logger.exception("failed to get player stats from database")
         return buildResponse(500, {"error": str(e)})
 
-def get_all_matches(conn, cursor):
-    """ Returns all matchIds from MatchData
+def get_all_matches(conn, cursor, event):
+    """ Returns a page of matchIds from MatchData, or with `ids`, those matches' documents
     """
     try:
-        cursor.execute("SELECT matchId FROM MatchData;")
-        matches = cursor.fetchall()
-        return buildResponse(200, matches)
+        params = event.get('queryStringParameters') or {}
+        if 'ids' in params:
+            return get_documents_by_ids(cursor, params.get('ids'), "MatchData", "matchData",
+                                        "matches", MULTI_GET_MAX_MATCHES)
+        return list_table(conn, cursor, event, "MatchData", "matchId", "matches", columns="matchId")
     except Exception as e:
         logger.exception("failed to get matches from database")
         return buildResponse(500, {"error": str(e)})
 
-def get_all_match_timelines(conn, cursor):
-    """ Returns all matchIds from MatchTimeline
+def get_all_match_timelines(conn, cursor, event):
+    """ Returns a page of matchIds from CompressedMatchTimeline, or with `ids`, those timelines
     """
     try:
-        cursor.execute("SELECT matchId FROM MatchTimeline;")
-        match_timelines = cursor.fetchall()
-        return buildResponse(200, match_timelines)
+        params = event.get('queryStringParameters') or {}
+        if 'ids' in params:
+            return get_documents_by_ids(cursor, params.get('ids'), "CompressedMatchTimeline", "timeline",
+                                        "matchTimelines", MULTI_GET_MAX_TIMELINES, decode=decode_timeline_text)
+        return list_table(conn, cursor, event, "CompressedMatchTimeline", "matchId", "matchTimelines",
+                          columns="matchId")
     except Exception as e:
         logger.exception("failed to get match timelines from database")
         return buildResponse(500, {"error": str(e)})
 
+def get_documents_by_ids(cursor, ids_param, table, column, result_key, max_ids, decode=None):
+    """ Fetches several stored documents with one IN query
+        Params: ids_param: comma-separated matchIds, at most `max_ids`
+                decode: turns a stored value into JSON text, e.g. decode_timeline_text
+        Return: { result_key: { matchId: document }, "missing": [matchIds not found] }
+    """
+    match_ids = []
+    for match_id in (ids_param or '').split(','):
+        match_id = match_id.strip()
+        if match_id and match_id not in match_ids:
+            match_ids.append(match_id)
+    if not match_ids:
+        return buildResponse(400, {"error": "Missing ids"})
+    if len(match_ids) > max_ids:
+        return buildResponse(400, {"error": f"At most {max_ids} ids can be requested at once"})
+
+    placeholders = ", ".join(["%s"] * len(match_ids))
+    cursor.execute(
+        f"SELECT matchId, {column} FROM {table} WHERE matchId IN ({placeholders})",
+        tuple(match_ids)
+    )
+    found = {}
+    for row in cursor.fetchall():
+        if row[column]:
+            found[row['matchId']] = RawJSON(decode(row[column]) if decode else row[column])
+
+    # Keep the requested order in the response
+    documents = {match_id: found[match_id] for match_id in match_ids if match_id in found}
+    missing = [match_id for match_id in match_ids if match_id not in found]
+    return buildResponse(200, {result_key: documents, "missing": missing})
+
+def list_table(conn, cursor, event, table, key, result_key, columns="*", json_fields=()):
+    """ Keyset-paginated listing shared by the bulk endpoints
+        Query params: limit, after (last `key` of the previous page), format=ndjson
+        JSON:   { result_key: [...], "nextCursor": str | None }
+        NDJSON: one row per line, continuation cursor in the X-Next-Cursor header
+    """
+    params = event.get('queryStringParameters') or {}
+    after = params.get('after') or ''
+    query = f"SELECT {columns} FROM {table} WHERE {key} > %s ORDER BY {key} LIMIT %s"
+
+    if params.get('format') == 'ndjson':
+        return export_ndjson(conn, query, after, key, json_fields)
+
+    try:
+        limit = parse_limit(params, default=LISTING_PAGE_SIZE, maximum=LISTING_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return buildResponse(400, {"error": str(e)})
+
+    cursor.execute(query, (after, limit))
+    rows = cursor.fetchall()
+    for row in rows:
+        wrap_json_fields(row, json_fields)
+    next_cursor = rows[-1][key] if len(rows) == limit else None
+    return buildResponse(200, {result_key: rows, "nextCursor": next_cursor})
+
+def export_ndjson(conn, query, after, key, json_fields=()):
+    """ Streams rows from an unbuffered cursor into an NDJSON body.
+        Stops before NDJSON_MAX_BYTES so the response fits the API Gateway payload
+        limit; only one fetchmany batch is held in memory besides the body itself.
+    """
+    export_cursor = conn.cursor(dictionary=True, buffered=False)
+    lines = []
+    size = 0
+    last_key = None
+    count = 0
+    truncated = False
+    try:
+        export_cursor.execute(query, (after, NDJSON_MAX_ROWS))
+        while not truncated:
+            batch = export_cursor.fetchmany(NDJSON_FETCH_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                wrap_json_fields(row, json_fields)
+                line = dumps(row, default=str) + '\n'
+                if size + len(line) > NDJSON_MAX_BYTES:
+                    truncated = True
+                    break
+                lines.append(line)
+                size += len(line)
+                last_key = row[key]
+                count += 1
+        if truncated:
+            # Discard the unread rows so the warm connection stays usable
+            conn.consume_results()
+    finally:
+        export_cursor.close()
+
+    next_cursor = last_key if truncated or count == NDJSON_MAX_ROWS else None
+    logger.info(f"Exported {count} rows ({size} bytes) as NDJSON, next cursor: {next_cursor}")
+    response = buildResponse(200)
+    response['headers']['Content-Type'] = 'application/x-ndjson'
+    response['headers']['Access-Control-Expose-Headers'] += ',X-Next-Cursor'
+    if next_cursor is not None:
+        response['headers']['X-Next-Cursor'] = str(next_cursor)
+    response['body'] = ''.join(lines)
+    return response
+
 def get_all_aggregate_champion_stats(conn, cursor):
     """Returns all aggregate champion stats"""
     try:
@@ -452,9 +1052,8 @@ def get_all_aggregate_champion_stats(conn, cursor):
             result = format_aggregate_champion_stats(rows, columns)
             return buildResponse(200, result)
         else:
-            logger.info(f"No match data found for {gameName}#{tagLine}")
+            logger.info("No aggregate champion stats found")
             return buildResponse(200, [])
-        return buildResponse(200, rows)
 
     except Exception as e:
         logger.exception("Failed to get aggregate champion stats from database")
@@ -528,12 +1127,21 @@ def delete_player(event, conn, cursor):
         if not gameName or not tagLine:
             return buildResponse(400, {"error": "Missing gameName or tagLine"})
 
+        # The connection autocommits; the delete and its version bump commit together
+        conn.start_transaction()
         cursor.execute("DELETE FROM Player WHERE gameName=%s and tagLine=%s", (gameName, tagLine))
         deleted_count = cursor.rowcount
+        # resolve_puuid falls back to RiotAccount; forget the Riot ID there too
+        cursor.execute("DELETE FROM RiotAccount WHERE gameName=%s and tagLine=%s", (gameName, tagLine))
+        bump_data_version(cursor, 'player')
         conn.commit()
+        # Don't let this container answer from the versions it read before the delete
+        expire_data_versions()
         logger.info(f"Successfully deleted {gameName}#{tagLine} from Player table")
         return buildResponse(200, {"message": f"Successfully deleted {deleted_count}"})
     except Exception as e:
+        if conn.in_transaction:
+            conn.rollback()
         logger.exception("failed to get player stats from database")
         return buildResponse(500, {"error": str(e)})
 
@@ -811,6 +1419,152 @@ def handle_player_request(requestBody):
     logger.info(f"Successfully processed player request for {gameName}#{tagLine}")
     return result
 
+def get_data_versions(scopes):
+    """ Returns {scope: (version, updatedAt)} for the given scopes.
+        The whole DataVersion table is re-read at most every DATA_VERSION_TTL seconds,
+        so cache hits and 304s usually need no RDS round trip.
+    """
+    global data_versions, data_versions_read_at
+    if time.time() - data_versions_read_at > DATA_VERSION_TTL:
+        version_cursor = get_connection().cursor(dictionary=True)
+        try:
+            version_cursor.execute("SELECT scope, version, updatedAt FROM DataVersion")
+            data_versions = {row['scope']: (row['version'], row['updatedAt']) for row in version_cursor.fetchall()}
+        finally:
+            version_cursor.close()
+        data_versions_read_at = time.time()
+    return {scope: data_versions[scope] for scope in scopes if scope in data_versions}
+
+def expire_data_versions():
+    """ Makes the next get_data_versions re-read DataVersion
+    """
+    global data_versions_read_at
+    data_versions_read_at = 0
+
+def bump_data_version(cursor, scope):
+    """ Marks `scope` as changed so conditional GETs and cached responses are revalidated.
+        Call inside the write's transaction.
+    """
+    cursor.execute(
+        """ INSERT INTO DataVersion (scope, version) VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+        """,
+        (scope,)
+    )
+
+def get_validator(event, scopes):
+    """ Builds (etag, last_modified) for a GET from the request and the data versions
+        it depends on, or None if the versions can't be read
+    """
+    try:
+        versions = get_data_versions(scopes)
+    except mysql.connector.Error:
+        logger.warning("Failed to read DataVersion, skipping conditional GET")
+        return None
+
+    params = event.get('queryStringParameters') or {}
+    key = json.dumps([
+        event.get('path'),
+        sorted(params.items()),
+        [(scope, versions.get(scope, (0, None))[0]) for scope in scopes]
+    ])
+    # Weak: the representation differs between gzip, brotli and identity encodings
+    etag = 'W/"' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:20] + '"'
+
+    updated = [updated_at for _, updated_at in versions.values() if updated_at]
+    last_modified = max(updated).replace(tzinfo=timezone.utc, microsecond=0) if updated else None
+    return etag, last_modified
+
+def is_not_modified(event, validator):
+    etag, last_modified = validator
+    if_none_match = get_header(event, 'If-None-Match')
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        # Weak comparison: ignore the W/ prefix on either side
+        return '*' in tags or any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in tags)
+
+    if_modified_since = get_header(event, 'If-Modified-Since')
+    if if_modified_since and last_modified:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def add_validator_headers(response, validator):
+    etag, last_modified = validator
+    response['headers']['ETag'] = etag
+    if last_modified:
+        response['headers']['Last-Modified'] = format_datetime(last_modified, usegmt=True)
+    # Let browsers keep the body but revalidate on every profile view
+    response['headers']['Cache-Control'] = 'no-cache'
+    return response
+
+def buildNotModifiedResponse(validator):
+    return add_validator_headers(buildResponse(304), validator)
+
+def get_header(event, name):
+    """ Case-insensitive request header lookup
+    """
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def choose_encoding(accept_encoding, available=('br', 'gzip')):
+    """ Picks the first of `available` an Accept-Encoding header allows, honouring q=0;
+        brotli only when it is installed
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    wildcard = accepted.get('*', 0.0)
+    for coding in available:
+        if coding == 'br' and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+def encode_response(response, accept_encoding):
+    """ Compresses the response body for API Gateway when the client accepts it.
+        Small bodies and ones that don't shrink are returned unchanged.
+    """
+    body = response.get('body') if response else None
+    if not body or response.get('isBase64Encoded'):
+        return response
+    response['headers']['Vary'] = 'Accept-Encoding'
+
+    encoding = choose_encoding(accept_encoding)
+    raw = body.encode('utf-8')
+    if encoding is None or len(raw) < COMPRESSION_MIN_BYTES:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(raw, quality=5)
+    else:
+        compressed = gzip.compress(raw, compresslevel=5, mtime=0)
+    if len(compressed) >= len(raw):
+        return response
+
+    response['body'] = base64.b64encode(compressed).decode('ascii')
+    response['isBase64Encoded'] = True
+    response['headers']['Content-Encoding'] = encoding
+    return response
+
 def buildResponse(statusCode, body=None):
     response = {
         'statusCode': statusCode,
@@ -818,9 +1572,10 @@ def buildResponse(statusCode, body=None):
             'Content-Type': 'application/json',
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': 'GET,POST,PATCH,DELETE,OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type'
+            'Access-Control-Allow-Headers': 'Content-Type,If-None-Match,If-Modified-Since',
+            'Access-Control-Expose-Headers': 'ETag,Last-Modified'
         }
     }
     if body is not None:
-        response['body'] = json.dumps(body)
+        response['body'] = dumps(body)
     return response
\ No newline at end of file
@@ -0,0 +1,135 @@
+# Single-pass PlayerStats computation. A player's ParticipantStats rows are folded
+# one at a time into totals: counts and running sums in a JSON-serializable dict
+# that can be merged and stored. finalize_totals turns totals into the PlayerStats
+# columns; averages skip missing values the way SQL AVG skips NULLs.
+
+# Columns of ParticipantStats read by fold_match
+PARTICIPANT_COLUMNS = """
+    matchId, gameStartTimestamp, gameDuration, championName, lane, role, win,
+    kda, killParticipation, damagePerMinute, teamDamagePercentage, soloKills,
+    goldPerMinute, visionScorePerMinute, goldEarned, teamGoldEarned,
+    totalMinionsKilled, neutralMinionsKilled, visionScore, wardsKilled,
+    damageDealtToObjectives, damageDealtToTurrets, turretTakedowns
+"""
+
+# PlayerStats JSON column -> metric -> value of one ParticipantStats row
+METRICS = {
+    "aggression": {
+        "dmg_percent": lambda r: r['teamDamagePercentage'],
+        "dpm": lambda r: r['damagePerMinute'],
+        "kda": lambda r: r['kda'],
+        "solo_kills": lambda r: r['soloKills'],
+        "kp": lambda r: r['killParticipation'],
+    },
+    "income": {
+        "gpm": lambda r: r['goldPerMinute'],
+        "gold_percentage": lambda r: r['goldEarned'] / r['teamGoldEarned'] if r['teamGoldEarned'] else None,
+        "cspm": lambda r: (r['totalMinionsKilled'] + r['neutralMinionsKilled']) / (r['gameDuration'] / 60)
+                          if r['gameDuration'] else None,
+    },
+    "vision": {
+        "avg_vpm": lambda r: r['visionScorePerMinute'],
+        "avg_vision_score": lambda r: r['visionScore'],
+        "avg_wards_cleared": lambda r: r['wardsKilled'],
+    },
+    "objective": {
+        "avg_dmg_to_objectives": lambda r: r['damageDealtToObjectives'],
+        "avg_dmg_to_turrets": lambda r: r['damageDealtToTurrets'],
+        "avg_turret_takedowns": lambda r: r['turretTakedowns'],
+    },
+}
+
+TOP_CHAMPIONS = 6
+
+def new_totals():
+    """ Returns empty totals
+        Return: {games, wins, roles: {role: n}, champions: {name: n}, sums: {metric: x}, counts: {metric: n}}
+    """
+    return {"games": 0, "wins": 0, "roles": {}, "champions": {}, "sums": {}, "counts": {}}
+
+def fold_match(totals, row):
+    """ Adds one ParticipantStats row to `totals` in place
+    """
+    totals["games"] += 1
+    totals["wins"] += 1 if row['win'] else 0
+
+    role = role_key(row['lane'], row['role'])
+    totals["roles"][role] = totals["roles"].get(role, 0) + 1
+    champion = row['championName']
+    totals["champions"][champion] = totals["champions"].get(champion, 0) + 1
+
+    for metrics in METRICS.values():
+        for name, value_of in metrics.items():
+            value = value_of(row)
+            if value is None:
+                continue
+            totals["sums"][name] = totals["sums"].get(name, 0) + value
+            totals["counts"][name] = totals["counts"].get(name, 0) + 1
+    return totals
+
+def merge_totals(into, other):
+    """ Adds `other` totals to `into` in place
+    """
+    into["games"] += other["games"]
+    into["wins"] += other["wins"]
+    for key in ("roles", "champions", "sums", "counts"):
+        for name, value in other[key].items():
+            into[key][name] = into[key].get(name, 0) + value
+    return into
+
+def finalize_totals(totals):
+    """ Returns the PlayerStats fields for `totals`
+        Return: {"role", "topChampions", "winrate", "aggression", "income", "vision", "objective"}
+    """
+    games = totals["games"]
+    res = {
+        "role": primary_role(totals["roles"]),
+        "topChampions": top_champions(totals["champions"]),
+        "winrate": totals["wins"] / games if games else None,
+    }
+    for column, metrics in METRICS.items():
+        res[column] = {
+            name: totals["sums"][name] / totals["counts"][name] if totals["counts"].get(name) else None
+            for name in metrics
+        }
+    return res
+
+def role_key(lane, role):
+    """ Buckets a lane/role pair; BOTTOM splits into BOTTOM (carry) and SUPPORT
+    """
+    if lane == "BOTTOM":
+        if role == "CARRY":
+            return "BOTTOM"
+        if role == "SUPPORT":
+            return "SUPPORT"
+        return "OTHER_BOTTOM"
+    return lane
+
+def primary_role(role_counts):
+    """ Return primary/secondary role of player
+        1) 70%+ on one role -> {"Primary": PRIMARY}
+        2) 50%+ on PRIMARY/SECONDARY -> {"Primary": PRIMARY, "Secondary": SECONDARY}
+        3) {"Primary": "FLEX"}
+    """
+    if not role_counts:
+        return {"Primary": "FLEX"}
+
+    total_games = sum(role_counts.values())
+    # Ties go to the first name, so the result doesn't depend on the order games were folded in
+    roles = sorted(role_counts, key=lambda role: (-role_counts[role], role))
+    primary = roles[0]
+    secondary = roles[1] if len(roles) > 1 else None
+
+    if role_counts[primary] / total_games >= 0.7:
+        return {"Primary": primary}
+    elif secondary and (role_counts[primary] + role_counts[secondary]) / total_games >= 0.5:
+        return {"Primary": primary, "Secondary": secondary}
+    else:
+        return {"Primary": "FLEX"}
+
+def top_champions(champion_counts, number_of_champions=TOP_CHAMPIONS):
+    """ Returns the most played champions in descending order: {"Trundle": 12, "Ahri": 10, ...}
+        Ties are ordered by name.
+    """
+    ranked = sorted(champion_counts.items(), key=lambda item: (-item[1], item[0]))
+    return dict(ranked[:number_of_champions])
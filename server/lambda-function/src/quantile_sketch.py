@@ -0,0 +1,85 @@
+import math
+from bisect import bisect_left
+
+# Mergeable quantile sketch with relative-error buckets (DDSketch). A value x > 0
+# lands in bucket ceil(log_gamma(x)), so any quantile estimate is within ALPHA of
+# the true value. Sketches are plain JSON-serializable dicts; merging two sketches
+# adds their bucket counts, so per-match updates and re-aggregation are exact.
+ALPHA = 0.02
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+LOG_GAMMA = math.log(GAMMA)
+# Values below this count as zero
+MIN_VALUE = 1e-4
+# Past this many buckets the lowest ones are collapsed together
+MAX_BUCKETS = 1024
+
+def new_sketch():
+    """ Returns an empty sketch: {count, zero, buckets: {key: count}}
+    """
+    return {"count": 0, "zero": 0, "buckets": {}}
+
+def bucket_key(value):
+    return math.ceil(math.log(value) / LOG_GAMMA)
+
+def add_value(sketch, value):
+    """ Adds one value to `sketch` in place; None is skipped
+    """
+    if value is None:
+        return sketch
+    sketch["count"] += 1
+    if value < MIN_VALUE:
+        sketch["zero"] += 1
+        return sketch
+    key = str(bucket_key(value))
+    sketch["buckets"][key] = sketch["buckets"].get(key, 0) + 1
+    if len(sketch["buckets"]) > MAX_BUCKETS:
+        collapse_lowest(sketch)
+    return sketch
+
+def merge_sketches(into, other):
+    """ Adds `other` to `into` in place
+    """
+    into["count"] += other["count"]
+    into["zero"] += other["zero"]
+    for key, count in other["buckets"].items():
+        into["buckets"][key] = into["buckets"].get(key, 0) + count
+    while len(into["buckets"]) > MAX_BUCKETS:
+        collapse_lowest(into)
+    return into
+
+def collapse_lowest(sketch):
+    keys = sorted(sketch["buckets"], key=int)
+    lowest, next_lowest = keys[0], keys[1]
+    sketch["buckets"][next_lowest] += sketch["buckets"].pop(lowest)
+
+class SketchRanker:
+    """ Read-only view of a sketch with cumulative counts, so rank() is a binary search
+    """
+
+    def __init__(self, sketch):
+        self.count = sketch["count"]
+        self.zero = sketch["zero"]
+        items = sorted((int(key), count) for key, count in sketch["buckets"].items())
+        self.keys = [key for key, _ in items]
+        self.counts = [count for _, count in items]
+        self.below = []
+        running = self.zero
+        for count in self.counts:
+            self.below.append(running)
+            running += count
+
+    def rank(self, value):
+        """ Returns the fraction of sketched values below `value` (ties count half), or None
+        """
+        if value is None or not self.count:
+            return None
+        if value < MIN_VALUE:
+            return (self.zero / 2) / self.count
+        key = bucket_key(value)
+        idx = bisect_left(self.keys, key)
+        if idx == len(self.keys):
+            return 1.0
+        below = self.below[idx]
+        if self.keys[idx] == key:
+            below += self.counts[idx] / 2
+        return below / self.count
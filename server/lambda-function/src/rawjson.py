@@ -0,0 +1,48 @@
+import json
+import re
+import uuid
+
+class RawJSON:
+    """ Marks JSON text read from the database that should be written into a response
+        body as-is instead of being decoded and re-encoded
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        if isinstance(text, (bytes, bytearray)):
+            text = text.decode('utf-8')
+        self.text = text
+
+def dumps(body, default=None):
+    """ json.dumps that splices RawJSON fragments into the output without parsing them.
+        Each fragment is encoded as a unique placeholder string first, so only the small
+        envelope around it goes through the json encoder. A token that also turns up
+        elsewhere in the body is replaced by a fresh one.
+    """
+    while True:
+        fragments = []
+        token = uuid.uuid4().hex
+
+        def encode_default(value):
+            if isinstance(value, RawJSON):
+                fragments.append(value.text)
+                return f"{token}{len(fragments) - 1}"
+            if default is not None:
+                return default(value)
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+        text = json.dumps(body, default=encode_default)
+        if not fragments:
+            return text
+        if text.count(token) == len(fragments):
+            break
+    placeholder = re.compile(f'"{token}(\\d+)"')
+    return placeholder.sub(lambda m: fragments[int(m.group(1))], text)
+
+def wrap_json_fields(record, json_fields):
+    """ Marks JSON text columns of a row as RawJSON in place
+    """
+    for field in json_fields:
+        if field in record and record[field]:
+            record[field] = RawJSON(record[field])
+    return record
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+# lambda_function reads these at import and looks up its SQS queues; without AWS
+# access the lookup fails once and is logged, as it does when a queue is missing
+for name, value in (("RDS_USER", "test"), ("RDS_PASSWORD", "test"), ("RDS_HOST", "localhost"),
+                    ("AWS_ACCESS_KEY_ID", "test"), ("AWS_SECRET_ACCESS_KEY", "test"),
+                    ("AWS_EC2_METADATA_DISABLED", "true"), ("AWS_MAX_ATTEMPTS", "1")):
+    os.environ.setdefault(name, value)
+
+@pytest.fixture(scope="session")
+def lambda_function():
+    """ The API module, imported once; needs boto3 like the Lambda runtime provides
+    """
+    pytest.importorskip("boto3")
+    import lambda_function
+    return lambda_function
+
+class FakeCursor:
+    """ Dictionary cursor that answers each execute() with the next queued result
+    """
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.executed = []
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.executed.append((" ".join(query.split()), params))
+        self.rows = self.results.pop(0) if self.results else []
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+@pytest.fixture
+def fake_cursor():
+    return FakeCursor
@@ -0,0 +1,89 @@
+import pytest
+
+import cache
+from cache import ResponseCache, copy_response
+
+def response(body, **headers):
+    return {"statusCode": 200, "headers": dict(headers), "body": body}
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+def test_hit_returns_the_cached_response(clock):
+    responses = ResponseCache()
+    responses.put("a", 1, response("body"), ttl=60)
+    assert responses.get("a", 1)["body"] == "body"
+    assert responses.stats()["hits"] == 1
+
+def test_miss(clock):
+    assert ResponseCache().get("a", 1) is None
+
+def test_evicts_least_recently_used_past_max_entries(clock):
+    responses = ResponseCache(max_entries=2)
+    responses.put("a", 1, response("a"), ttl=60)
+    responses.put("b", 1, response("b"), ttl=60)
+    responses.get("a", 1)
+    responses.put("c", 1, response("c"), ttl=60)
+    assert responses.get("b", 1) is None
+    assert responses.get("a", 1) is not None
+    assert responses.get("c", 1) is not None
+    assert responses.stats()["evictions"] == 1
+
+def test_evicts_past_max_bytes(clock):
+    responses = ResponseCache(max_bytes=10)
+    responses.put("a", 1, response("x" * 4), ttl=60)
+    responses.put("b", 1, response("x" * 4), ttl=60)
+    responses.put("c", 1, response("x" * 4), ttl=60)
+    assert responses.get("a", 1) is None
+    assert responses.stats()["bytes"] == 8
+    assert responses.stats()["entries"] == 2
+
+def test_skips_a_response_larger_than_the_cache(clock):
+    responses = ResponseCache(max_bytes=10)
+    responses.put("a", 1, response("x" * 4), ttl=60)
+    responses.put("big", 1, response("x" * 11), ttl=60)
+    assert responses.get("big", 1) is None
+    assert responses.get("a", 1) is not None
+
+def test_replacing_a_key_keeps_the_byte_count(clock):
+    responses = ResponseCache()
+    responses.put("a", 1, response("x" * 4), ttl=60)
+    responses.put("a", 2, response("x" * 6), ttl=60)
+    assert responses.stats() == {"entries": 1, "bytes": 6, "hits": 0, "misses": 0, "evictions": 0}
+
+def test_expires_after_ttl(clock):
+    responses = ResponseCache()
+    responses.put("a", 1, response("a"), ttl=60)
+    clock[0] += 60
+    assert responses.get("a", 1) is not None
+    clock[0] += 1
+    assert responses.get("a", 1) is None
+    assert responses.stats()["entries"] == 0
+    assert responses.stats()["bytes"] == 0
+
+def test_drops_an_entry_built_from_another_version(clock):
+    responses = ResponseCache()
+    responses.put("a", 'W/"v1"', response("a"), ttl=60)
+    assert responses.get("a", 'W/"v2"') is None
+    # Dropped, not just skipped: the old version is gone too
+    assert responses.get("a", 'W/"v1"') is None
+
+def test_cached_headers_are_isolated(clock):
+    responses = ResponseCache()
+    original = response("a", ETag="e")
+    responses.put("a", 1, original, ttl=60)
+    original["headers"]["X-Cache"] = "MISS"
+
+    first = responses.get("a", 1)
+    first["headers"]["Content-Encoding"] = "gzip"
+    first["body"] = "compressed"
+    second = responses.get("a", 1)
+    assert second["headers"] == {"ETag": "e"}
+    assert second["body"] == "a"
+
+def test_copy_response_without_headers():
+    copied = copy_response({"statusCode": 204})
+    assert copied == {"statusCode": 204, "headers": {}}
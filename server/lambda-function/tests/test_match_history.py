@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+@pytest.mark.parametrize("params, expected", [
+    ({}, 20),
+    ({"limit": ""}, 20),
+    ({"limit": "5"}, 5),
+    ({"limit": "100"}, 100),
+    ({"limit": "101"}, 100),
+    ({"limit": "999999999999"}, 100),
+    ({"limit": "0"}, 1),
+    ({"limit": "-5"}, 1),
+])
+def test_parse_limit_clamps(lambda_function, params, expected):
+    assert lambda_function.parse_limit(params, default=20, maximum=100) == expected
+
+@pytest.mark.parametrize("limit", ["abc", "1.5", "1e3", "5;", "0x10"])
+def test_parse_limit_rejects_non_integers(lambda_function, limit):
+    with pytest.raises(ValueError):
+        lambda_function.parse_limit({"limit": limit}, default=20, maximum=100)
+
+def test_parse_cursor_defaults_to_newest(lambda_function):
+    assert lambda_function.parse_match_history_cursor(None) == (lambda_function.MAX_TIMESTAMP, '')
+    assert lambda_function.parse_match_history_cursor('') == (lambda_function.MAX_TIMESTAMP, '')
+
+def test_parse_cursor_splits_on_first_underscore(lambda_function):
+    assert lambda_function.parse_match_history_cursor("1700000000000_NA1_5012345678") == \
+        (1700000000000, "NA1_5012345678")
+
+@pytest.mark.parametrize("cursor", [
+    "NA1_5012345678",
+    "1700000000000",
+    "1700000000000_",
+    "_NA1_1",
+    "-1_NA1_1",
+    "17e11_NA1_1",
+    "١٧٠٠_NA1_1",
+    "99999999999999999999_NA1_1",
+    "eyJ0cyI6IDF9",
+    '{"ts": 1, "matchId": "NA1_1"}',
+])
+def test_parse_cursor_rejects_malformed(lambda_function, cursor):
+    with pytest.raises(ValueError):
+        lambda_function.parse_match_history_cursor(cursor)
+
+def history_rows(count):
+    return [
+        {"matchId": f"NA1_{idx}", "gameStartTimestamp": 1000 - idx, "card": json.dumps({"participants": []})}
+        for idx in range(count)
+    ]
+
+def test_full_page_continues_from_its_oldest_row(lambda_function, fake_cursor):
+    cursor = fake_cursor(history_rows(3))
+    matches, next_cursor = lambda_function.fetch_match_history(cursor, "puuid", 3, 2000, "")
+    assert list(matches) == ["NA1_0", "NA1_1", "NA1_2"]
+    assert next_cursor == "998_NA1_2"
+    assert lambda_function.parse_match_history_cursor(next_cursor) == (998, "NA1_2")
+    assert cursor.executed[0][1] == ("puuid", 2000, 2000, "", 3)
+
+def test_short_page_is_the_last(lambda_function, fake_cursor):
+    matches, next_cursor = lambda_function.fetch_match_history(fake_cursor(history_rows(2)), "puuid", 3, 2000, "")
+    assert len(matches) == 2
+    assert next_cursor is None
+
+def test_empty_page(lambda_function, fake_cursor):
+    assert lambda_function.fetch_match_history(fake_cursor([]), "puuid", 3, 2000, "") == ({}, None)
@@ -0,0 +1,140 @@
+import json
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+from player_stats import METRICS, new_totals, fold_match, merge_totals, finalize_totals, primary_role, role_key
+
+POSITIONS = [("TOP", "SOLO"), ("JUNGLE", "NONE"), ("MIDDLE", "SOLO"), ("BOTTOM", "CARRY"),
+             ("BOTTOM", "SUPPORT"), ("BOTTOM", "DUO"), ("NONE", "NONE")]
+CHAMPIONS = ["Ahri", "Trundle", "Jinx", "Thresh", "LeeSin", "Garen", "Lux", "Ornn"]
+DAY_MS = 24 * 60 * 60 * 1000
+
+def participant_rows(count, seed=402):
+    """ ParticipantStats rows over ~60 days, with the NULLs and zeros real rows have
+    """
+    rng = random.Random(seed)
+    rows = []
+    for idx in range(count):
+        lane, role = rng.choice(POSITIONS)
+        maybe = lambda value: None if rng.random() < 0.1 else value
+        rows.append({
+            "matchId": f"NA1_{idx}",
+            "gameStartTimestamp": 1_700_000_000_000 + rng.randrange(60 * DAY_MS),
+            "gameDuration": rng.choice([0, rng.randint(900, 2700)]),
+            "championName": rng.choice(CHAMPIONS),
+            "lane": lane,
+            "role": role,
+            "win": rng.random() < 0.5,
+            "kda": maybe(rng.uniform(0, 12)),
+            "killParticipation": maybe(rng.uniform(0, 1)),
+            "damagePerMinute": maybe(rng.uniform(100, 1500)),
+            "teamDamagePercentage": maybe(rng.uniform(0, 0.5)),
+            "soloKills": maybe(rng.randint(0, 5)),
+            "goldPerMinute": maybe(rng.uniform(200, 600)),
+            "visionScorePerMinute": maybe(rng.uniform(0, 4)),
+            "goldEarned": rng.randint(0, 20000),
+            "teamGoldEarned": rng.choice([0, rng.randint(20000, 90000)]),
+            "totalMinionsKilled": rng.randint(0, 350),
+            "neutralMinionsKilled": rng.randint(0, 200),
+            "visionScore": rng.randint(0, 120),
+            "wardsKilled": rng.randint(0, 30),
+            "damageDealtToObjectives": rng.randint(0, 40000),
+            "damageDealtToTurrets": rng.randint(0, 15000),
+            "turretTakedowns": rng.randint(0, 8),
+        })
+    return rows
+
+def stored(totals):
+    """ Round-trips totals through the JSON column they are stored in
+    """
+    return json.loads(json.dumps(totals))
+
+def assert_same_stats(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, dict) and key in METRICS:
+            assert actual[key] == pytest.approx(value, rel=1e-9)
+        elif isinstance(value, float):
+            assert actual[key] == pytest.approx(value, rel=1e-9)
+        else:
+            assert actual[key] == value
+
+def single_pass(rows):
+    totals = new_totals()
+    for row in rows:
+        fold_match(totals, row)
+    return finalize_totals(totals)
+
+@pytest.mark.parametrize("count", [1, 2, 37, 500])
+def test_incremental_totals_equal_a_full_recompute(count):
+    rows = participant_rows(count)
+
+    # One refresh per new match, reading and writing PlayerStatsTotals each time
+    totals = stored(new_totals())
+    for row in rows:
+        totals = stored(fold_match(totals, row))
+
+    # PlayerStatsDay buckets, filled in arrival order, then merged for all days
+    days = {}
+    for row in rows:
+        day = datetime.fromtimestamp(row["gameStartTimestamp"] / 1000, tz=timezone.utc).date()
+        days[day] = stored(fold_match(days.get(day, new_totals()), row))
+    merged = new_totals()
+    for day in sorted(days, reverse=True):
+        merge_totals(merged, days[day])
+
+    expected = single_pass(rows)
+    assert_same_stats(finalize_totals(totals), expected)
+    assert_same_stats(finalize_totals(merged), expected)
+    assert totals["games"] == merged["games"] == count
+
+def test_single_pass_matches_sql_averages():
+    rows = participant_rows(200)
+    stats = single_pass(rows)
+    kdas = [row["kda"] for row in rows if row["kda"] is not None]
+    assert stats["aggression"]["kda"] == pytest.approx(sum(kdas) / len(kdas))
+    # Rows with no team gold or duration are skipped, like a NULL in AVG
+    shares = [row["goldEarned"] / row["teamGoldEarned"] for row in rows if row["teamGoldEarned"]]
+    assert stats["income"]["gold_percentage"] == pytest.approx(sum(shares) / len(shares))
+    assert stats["winrate"] == pytest.approx(sum(row["win"] for row in rows) / len(rows))
+
+def test_empty_totals():
+    stats = finalize_totals(new_totals())
+    assert stats["winrate"] is None
+    assert stats["role"] == {"Primary": "FLEX"}
+    assert stats["topChampions"] == {}
+    assert all(value is None for column in METRICS for value in stats[column].values())
+
+def test_merging_empty_totals_changes_nothing():
+    totals = fold_match(new_totals(), participant_rows(1)[0])
+    before = stored(totals)
+    assert merge_totals(totals, new_totals()) == before
+
+@pytest.mark.parametrize("lane, role, expected", [
+    ("BOTTOM", "CARRY", "BOTTOM"),
+    ("BOTTOM", "SUPPORT", "SUPPORT"),
+    ("BOTTOM", "DUO", "OTHER_BOTTOM"),
+    ("TOP", "SOLO", "TOP"),
+])
+def test_role_key(lane, role, expected):
+    assert role_key(lane, role) == expected
+
+@pytest.mark.parametrize("counts, expected", [
+    ({"TOP": 7, "JUNGLE": 3}, {"Primary": "TOP"}),
+    ({"TOP": 4, "JUNGLE": 2, "MIDDLE": 2, "SUPPORT": 2}, {"Primary": "TOP", "Secondary": "JUNGLE"}),
+    ({"TOP": 2, "JUNGLE": 2, "MIDDLE": 2, "SUPPORT": 2, "BOTTOM": 2}, {"Primary": "FLEX"}),
+])
+def test_primary_role(counts, expected):
+    assert primary_role(counts) == expected
+
+def test_ties_do_not_depend_on_fold_order():
+    rows = [row for row in participant_rows(40) if row["championName"] in ("Ahri", "Lux")][:4]
+    for idx, row in enumerate(rows):
+        row["championName"] = ["Lux", "Ahri"][idx % 2]
+        row["lane"], row["role"] = [("MIDDLE", "SOLO"), ("TOP", "SOLO")][idx % 2]
+    forward = single_pass(rows)
+    backward = single_pass(reversed(rows))
+    assert list(forward["topChampions"]) == list(backward["topChampions"]) == ["Ahri", "Lux"]
+    assert forward["role"] == backward["role"] == {"Primary": "MIDDLE", "Secondary": "TOP"}
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+@pytest.mark.parametrize("fields_param, expected", [
+    (None, []),
+    ("", []),
+    ("metadata", ["metadata"]),
+    ("metadata.participants", ["metadata.participants"]),
+    ("info.participants[*].challenges", ["info.participants[*].challenges"]),
+    ("info.participants[3].puuid", ["info.participants[3].puuid"]),
+    ("info.frames[0].participantFrames.1.totalGold", ["info.frames[0].participantFrames.1.totalGold"]),
+    ("info.frames[*][0]", ["info.frames[*][0]"]),
+    (" metadata , info.gameDuration ,", ["metadata", "info.gameDuration"]),
+    ("metadata,metadata", ["metadata"]),
+])
+def test_accepted_fields(lambda_function, fields_param, expected):
+    assert lambda_function.parse_projection_fields(fields_param) == expected
+
+@pytest.mark.parametrize("field", [
+    "$.metadata",
+    "metadata.",
+    ".metadata",
+    "metadata..participants",
+    "info.participants[",
+    "info.participants]",
+    "info.participants[]",
+    "info.participants[-1]",
+    "info.participants[1 to 3]",
+    "info.participants[last]",
+    "info.**.puuid",
+    "info.*",
+    "[0]",
+    "info.\"puuid\"",
+    "info.'puuid'",
+    "info.puuid') FROM Player -- ",
+    "info.pu uid",
+    "info.pu%uid",
+    "info\\.puuid",
+    "info.puuid\"),(\"x",
+    "info.puuïd",
+])
+def test_rejected_fields(lambda_function, field):
+    with pytest.raises(ValueError):
+        lambda_function.parse_projection_fields(f"metadata,{field}")
+
+def test_field_count_is_capped(lambda_function):
+    limit = lambda_function.PROJECTION_MAX_FIELDS
+    fields = ",".join(f"f{idx}" for idx in range(limit))
+    assert len(lambda_function.parse_projection_fields(fields)) == limit
+    with pytest.raises(ValueError):
+        lambda_function.parse_projection_fields(fields + ",extra")
+
+@pytest.mark.parametrize("field, root, expected", [
+    ("metadata", "$", '$."metadata"'),
+    ("info.participants[*].challenges", "$", '$."info"."participants"[*]."challenges"'),
+    ("info.frames[0].participantFrames.1", "$", '$."info"."frames"[0]."participantFrames"."1"'),
+    ("challenges.kda", "", '."challenges"."kda"'),
+])
+def test_to_json_path_quotes_every_key(lambda_function, field, root, expected):
+    assert lambda_function.to_json_path(field, root=root) == expected
+
+DOCUMENT = {
+    "metadata": {"participants": ["a", "b"]},
+    "info": {
+        "frames": [
+            {"participantFrames": {"1": {"totalGold": 500}, "2": {"totalGold": 450}}},
+            {"participantFrames": {"1": {"totalGold": 900}}},
+        ],
+    },
+}
+
+@pytest.mark.parametrize("field, expected", [
+    ("metadata.participants", ["a", "b"]),
+    ("metadata.participants[1]", "b"),
+    ("metadata.participants[2]", None),
+    ("metadata.missing", None),
+    ("info.frames[0].participantFrames.1.totalGold", 500),
+    ("info.frames[*].participantFrames.2.totalGold", [450]),
+    ("info.frames[*].participantFrames.1.totalGold", [500, 900]),
+    ("info.frames[*].participantFrames.3", None),
+    ("metadata[0]", None),
+    ("metadata.participants.length", None),
+])
+def test_extract_json_path(lambda_function, field, expected):
+    assert lambda_function.extract_json_path(DOCUMENT, field) == expected
+
+def test_rejected_field_never_reaches_mysql(lambda_function, fake_cursor):
+    cursor = fake_cursor()
+    response = lambda_function.get_match_projection(
+        cursor, "MatchData", "matchData", "NA1_1", {"fields": "info.puuid') OR 1=1 -- "})
+    assert response["statusCode"] == 400
+    assert cursor.executed == []
+
+def test_paths_are_bound_parameters(lambda_function, fake_cursor):
+    cursor = fake_cursor([{"matchId": "NA1_1", "f0": '["a", "b"]', "f1": None}])
+    response = lambda_function.get_match_projection(
+        cursor, "MatchData", "matchData", "NA1_1", {"fields": "metadata.participants,info.missing"})
+    query, params = cursor.executed[0]
+    assert "metadata" not in query
+    assert params == ('$."metadata"."participants"', '$."info"."missing"', "NA1_1")
+    assert json.loads(response["body"]) == {
+        "matchId": "NA1_1",
+        "fields": {"metadata.participants": ["a", "b"], "info.missing": None},
+    }
@@ -0,0 +1,88 @@
+import json
+import random
+
+import pytest
+
+from quantile_sketch import ALPHA, MAX_BUCKETS, MIN_VALUE, new_sketch, add_value, merge_sketches, SketchRanker
+
+def sketch_of(values):
+    sketch = new_sketch()
+    for value in values:
+        add_value(sketch, value)
+    return sketch
+
+def exact_rank(values, value):
+    """ SketchRanker.rank on the exact values: below plus half the ties
+    """
+    below = sum(1 for other in values if other < value)
+    ties = sum(1 for other in values if other == value)
+    return (below + ties / 2) / len(values)
+
+def value_at(values, rank):
+    ordered = sorted(values)
+    return ordered[min(int(rank * len(ordered)), len(ordered) - 1)]
+
+@pytest.fixture
+def values():
+    rng = random.Random(402)
+    return [rng.lognormvariate(5, 1.5) for _ in range(5000)]
+
+def test_insert_counts_every_value(values):
+    sketch = sketch_of(values + [None, 0, MIN_VALUE / 2])
+    assert sketch["count"] == len(values) + 2
+    assert sketch["zero"] == 2
+    assert sum(sketch["buckets"].values()) == len(values)
+
+@pytest.mark.parametrize("rank", [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99])
+def test_rank_is_exact_up_to_values_within_alpha(values, rank):
+    # Every value within ALPHA of the probe shares its bucket or a neighbour, so
+    # the estimate falls between the exact ranks just below and just above it
+    ranker = SketchRanker(sketch_of(values))
+    probe = value_at(values, rank)
+    estimate = ranker.rank(probe)
+    assert exact_rank(values, probe * (1 - 2 * ALPHA)) <= estimate <= exact_rank(values, probe * (1 + 2 * ALPHA))
+
+def test_merge_equals_inserting_everything(values):
+    halves = [sketch_of(values[:1234]), sketch_of(values[1234:])]
+    # Through JSON, as the sketches are stored
+    merged = merge_sketches(json.loads(json.dumps(halves[0])), json.loads(json.dumps(halves[1])))
+    assert merged == json.loads(json.dumps(sketch_of(values)))
+
+def test_merging_an_empty_sketch_changes_nothing(values):
+    sketch = sketch_of(values)
+    before = json.loads(json.dumps(sketch))
+    assert merge_sketches(sketch, new_sketch()) == before
+
+def test_rank_bounds(values):
+    ranker = SketchRanker(sketch_of(values))
+    assert ranker.rank(max(values) * 2) == 1.0
+    assert ranker.rank(min(values) / 2) == 0.0
+    assert ranker.rank(None) is None
+
+def test_zero_values_rank_in_the_middle_of_the_zeros():
+    ranker = SketchRanker(sketch_of([0, 0, 5, 10]))
+    assert ranker.rank(0) == pytest.approx(0.25)
+    assert ranker.rank(100) == 1.0
+
+def test_empty_sketch():
+    ranker = SketchRanker(new_sketch())
+    assert ranker.rank(1.0) is None
+    assert ranker.rank(0) is None
+
+def test_collapses_lowest_buckets_past_max_buckets():
+    # One value per bucket, from the smallest up
+    values = [(1 + ALPHA) ** (2 * step) for step in range(MAX_BUCKETS + 50)]
+    sketch = sketch_of(values)
+    assert len(sketch["buckets"]) == MAX_BUCKETS
+    assert sum(sketch["buckets"].values()) == len(values)
+    # The top buckets are untouched, so high ranks keep their accuracy
+    ranker = SketchRanker(sketch)
+    top = values[-10]
+    assert exact_rank(values, top * (1 - 2 * ALPHA)) <= ranker.rank(top) <= exact_rank(values, top * (1 + 2 * ALPHA))
+
+def test_merge_collapses_past_max_buckets():
+    low = sketch_of([(1 + ALPHA) ** (2 * step) for step in range(MAX_BUCKETS)])
+    high = sketch_of([(1 + ALPHA) ** (2 * step) for step in range(MAX_BUCKETS, MAX_BUCKETS + 20)])
+    merged = merge_sketches(low, high)
+    assert len(merged["buckets"]) == MAX_BUCKETS
+    assert merged["count"] == MAX_BUCKETS + 20
@@ -0,0 +1,63 @@
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+import rawjson
+from rawjson import RawJSON, dumps, wrap_json_fields
+
+def test_without_fragments_matches_json_dumps():
+    body = {"a": [1, "two", None], "b": {"c": True}}
+    assert dumps(body) == json.dumps(body)
+
+def test_fragment_is_spliced_verbatim():
+    text = '{"z": 1,   "a": [1.50, 2e3]}'
+    assert dumps({"matchId": "NA1_1", "matchData": RawJSON(text)}) == \
+        '{"matchId": "NA1_1", "matchData": ' + text + '}'
+
+def test_bytes_fragment():
+    assert dumps({"a": RawJSON(b'{"x": "\xc3\xa9"}')}) == '{"a": {"x": "\xe9"}}'
+
+def test_nested_fragments():
+    body = {"outer": {"inner": RawJSON('{"x": 1}'), "list": [{"deep": RawJSON('[2, 3]')}]}}
+    assert json.loads(dumps(body)) == {"outer": {"inner": {"x": 1}, "list": [{"deep": [2, 3]}]}}
+
+def test_fragments_inside_lists_keep_their_order():
+    body = [RawJSON(str(idx)) for idx in range(12)] + ["tail"]
+    assert json.loads(dumps(body)) == list(range(12)) + ["tail"]
+
+def test_fragment_containing_placeholder_text_is_not_rewritten(monkeypatch):
+    token = uuid.UUID(int=1)
+    monkeypatch.setattr(rawjson.uuid, "uuid4", lambda: token)
+    fragment = '{"note": "%s0", "path": "C:\\\\1"}' % token.hex
+    assert dumps({"a": RawJSON(fragment)}) == '{"a": ' + fragment + '}'
+
+@pytest.mark.parametrize("template", ["%s0", '"%s0"', "before %s0 after", "%s"])
+def test_payload_string_containing_a_placeholder(monkeypatch, template):
+    # The first token also appears in the body, so dumps has to pick another
+    tokens = iter([uuid.UUID(int=1), uuid.UUID(int=2)])
+    monkeypatch.setattr(rawjson.uuid, "uuid4", lambda: next(tokens))
+    name = template % uuid.UUID(int=1).hex
+    body = {"name": name, "raw": RawJSON('{"x": 1}')}
+    assert json.loads(dumps(body)) == {"name": name, "raw": {"x": 1}}
+
+def test_default_handles_other_types():
+    stamp = datetime(2025, 1, 2)
+    text = dumps({"at": stamp, "raw": RawJSON("1")}, default=lambda value: value.isoformat())
+    assert json.loads(text) == {"at": "2025-01-02T00:00:00", "raw": 1}
+
+def test_unserializable_without_default():
+    with pytest.raises(TypeError):
+        dumps({"at": datetime(2025, 1, 2), "raw": RawJSON("1")})
+
+def test_wrap_json_fields_marks_present_non_empty_columns():
+    row = {"puuid": "p", "role": '{"TOP": 3}', "income": None, "vision": "", "topChampions": b'["Ahri"]'}
+    assert wrap_json_fields(row, ["role", "income", "vision", "topChampions", "missing"]) is row
+    assert isinstance(row["role"], RawJSON)
+    assert isinstance(row["topChampions"], RawJSON)
+    assert row["income"] is None
+    assert row["vision"] == ""
+    assert "missing" not in row
+    assert json.loads(dumps(row)) == {"puuid": "p", "role": {"TOP": 3}, "income": None,
+                                      "vision": "", "topChampions": ["Ahri"]}
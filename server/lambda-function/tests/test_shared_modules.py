@@ -0,0 +1,22 @@
+""" Modules each Lambda bundles its own copy of must stay identical; edit one and
+    copy it over the others.
+"""
+import filecmp
+import os
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# module -> the Lambdas that bundle it
+SHARED_MODULES = {
+    "player_stats.py": ["lambda-function", "player-lambda-handler"],
+    "quantile_sketch.py": ["lambda-function", "match-lambda-handler"],
+    "timeline_codec.py": ["lambda-function", "match-lambda-handler"],
+}
+
+@pytest.mark.parametrize("module", sorted(SHARED_MODULES))
+def test_copies_are_identical(module):
+    first, *others = [os.path.join(SERVER_DIR, name, "src", module) for name in SHARED_MODULES[module]]
+    for other in others:
+        assert filecmp.cmp(first, other, shallow=False), f"{other} differs from {first}"
@@ -0,0 +1,99 @@
+import base64
+import gzip
+import json
+import zlib
+
+import pytest
+
+from timeline_codec import (MAGIC, FORMAT_GZIP, FORMAT_RESPONSE_GZIP, TIMELINE_KEY,
+                            encode_timeline, read_header, response_gzip, decode_timeline_text)
+
+TIMELINE = {
+    "metadata": {"matchId": "NA1_1", "participants": ["a", "b"]},
+    "info": {
+        "frameInterval": 60000,
+        "frames": [
+            {"timestamp": 0, "events": [{"type": "PAUSE_END"}], "participantFrames": {"1": {"totalGold": 500}}},
+            # Text that looks like the key format 2 is split on
+            {"timestamp": 60000, "events": [{"type": "NOTE", "text": TIMELINE_KEY + "é"}]},
+        ],
+    },
+}
+
+def format_1(timeline):
+    """ A timeline stored before format 2: the bare document, one gzip member
+    """
+    return MAGIC + bytes([FORMAT_GZIP]) + gzip.compress(json.dumps(timeline).encode('utf-8'))
+
+def single_member(data):
+    """ Returns the text of `data` if it is exactly one gzip member, else fails
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    text = decompressor.decompress(data)
+    assert decompressor.eof
+    assert decompressor.unused_data == b''
+    return text.decode('utf-8')
+
+@pytest.mark.parametrize("match_id", ["NA1_1", 'NA1_"quoted"', "NA1_é"])
+def test_format_2_round_trip(match_id):
+    blob = encode_timeline(match_id, TIMELINE)
+    assert read_header(blob)[0] == FORMAT_RESPONSE_GZIP
+    assert json.loads(decode_timeline_text(blob)) == TIMELINE
+
+def test_format_1_round_trip():
+    blob = format_1(TIMELINE)
+    assert read_header(blob)[0] == FORMAT_GZIP
+    assert json.loads(decode_timeline_text(blob)) == TIMELINE
+
+def test_format_2_holds_the_response_body_as_one_member():
+    member = response_gzip(encode_timeline('NA1_"1"', TIMELINE))
+    assert json.loads(single_member(member)) == {"matchId": 'NA1_"1"', "matchTimeline": TIMELINE}
+
+def test_format_1_has_no_response_body():
+    assert response_gzip(format_1(TIMELINE)) is None
+
+def test_encoding_is_deterministic():
+    assert encode_timeline("NA1_1", TIMELINE) == encode_timeline("NA1_1", json.loads(json.dumps(TIMELINE)))
+
+def test_reads_memoryview_blobs():
+    blob = encode_timeline("NA1_1", TIMELINE)
+    assert json.loads(decode_timeline_text(memoryview(blob))) == TIMELINE
+
+@pytest.mark.parametrize("blob", [b"", b"RRT", b"XYZ\x02" + gzip.compress(b"{}"), MAGIC + b"\x09" + gzip.compress(b"{}")])
+def test_rejects_unknown_blobs(blob):
+    with pytest.raises(ValueError):
+        read_header(blob)
+
+def test_gzip_client_gets_the_stored_member(lambda_function):
+    blob = encode_timeline("NA1_1", TIMELINE)
+    response = lambda_function.build_timeline_response("NA1_1", blob, "gzip, deflate")
+    assert response["isBase64Encoded"] is True
+    assert response["headers"]["Content-Encoding"] == "gzip"
+    member = base64.b64decode(response["body"])
+    assert member == response_gzip(blob)
+    assert json.loads(single_member(member)) == {"matchId": "NA1_1", "matchTimeline": TIMELINE}
+
+def test_other_clients_get_the_body_decompressed(lambda_function):
+    response = lambda_function.build_timeline_response("NA1_1", encode_timeline("NA1_1", TIMELINE), None)
+    assert "Content-Encoding" not in response["headers"]
+    assert json.loads(response["body"]) == {"matchId": "NA1_1", "matchTimeline": TIMELINE}
+
+def test_format_1_response_gets_its_envelope_at_read_time(lambda_function):
+    response = lambda_function.build_timeline_response("NA1_1", format_1(TIMELINE), "gzip")
+    assert json.loads(response["body"]) == {"matchId": "NA1_1", "matchTimeline": TIMELINE}
+
+def test_missing_timeline_is_one_query(lambda_function, fake_cursor):
+    cursor = fake_cursor([])
+    response = lambda_function.get_match_timeline({"queryStringParameters": {"matchId": "NA1_1"}}, None, cursor)
+    assert response["statusCode"] == 404
+    assert [query for query, _ in cursor.executed] == \
+        ["SELECT timeline FROM CompressedMatchTimeline WHERE matchId = %s"]
+
+def test_multi_get_decodes_each_timeline(lambda_function, fake_cursor):
+    cursor = fake_cursor([{"matchId": "NA1_2", "timeline": format_1(TIMELINE)},
+                          {"matchId": "NA1_1", "timeline": encode_timeline("NA1_1", TIMELINE)}])
+    response = lambda_function.get_all_match_timelines(
+        None, cursor, {"queryStringParameters": {"ids": "NA1_1,NA1_2,NA1_3"}})
+    assert len(cursor.executed) == 1
+    assert json.loads(response["body"]) == {"matchTimelines": {"NA1_1": TIMELINE, "NA1_2": TIMELINE},
+                                            "missing": ["NA1_3"]}
@@ -1,10 +1,17 @@
+import boto3
 import json
 import os
 import logging
+import threading
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
 import mysql.connector
 import urllib.request
 import urllib.parse
+from match_card import build_match_card, team_gold_earned, participant_metrics
+from quantile_sketch import new_sketch, add_value
+from timeline_codec import encode_timeline
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -23,18 +30,157 @@ STATS_HEADERS = {
     "Origin": "https://developer.riotgames.com"
 }
 
+# A batch's Riot fetches run concurrently on this pool, kept warm with the
+# container. Every fetch gives up at the batch deadline, RIOT_BATCH_TIMEOUT after
+# the fetches start, well inside the function's 60 s timeout; each request times
+# out after RIOT_REQUEST_TIMEOUT.
+RIOT_FETCH_WORKERS = 5
+RIOT_BATCH_TIMEOUT = 40
+RIOT_REQUEST_TIMEOUT = 5
+riot_pool = ThreadPoolExecutor(max_workers=RIOT_FETCH_WORKERS)
+
+# After a 429 no fetch is sent before riot_retry_at (epoch seconds), per Riot's
+# Retry-After; seconds to wait when a 429 comes without one
+RIOT_DEFAULT_RETRY_AFTER = 1
+riot_retry_at = 0
+riot_retry_lock = threading.Lock()
+
+class RiotFetchError(Exception):
+    """ A Riot fetch that failed in a way worth retrying: rate limited past the
+        batch deadline, a network error, or an HTTP error other than 404
+    """
+
+# Maintenance actions queue their next batch on the match queue; the URL is
+# looked up on first use
+sqs = boto3.client('sqs', region_name='us-east-1')
+match_queue_url = None
+
+# ChampionStatSketch rows per champion: one per teamPosition plus this all-roles row
+ALL_POSITIONS = 'ALL'
+
 # Warm lambda connection
 conn = None
 cursor = None
 
+# Tables derived from MatchData at ingest. Created once per container.
+SCHEMA = [
+    """ CREATE TABLE IF NOT EXISTS ParticipantStats (
+            matchId                 VARCHAR(32)  NOT NULL,
+            puuid                   VARCHAR(100) NOT NULL,
+            participantId           TINYINT      NOT NULL,
+            teamId                  SMALLINT     NOT NULL,
+            gameStartTimestamp      BIGINT       NOT NULL,
+            gameDuration            INT          NOT NULL,
+            championId              INT          NOT NULL,
+            championName            VARCHAR(100) NOT NULL,
+            riotIdGameName          VARCHAR(255),
+            riotIdTagline           VARCHAR(32),
+            lane                    VARCHAR(20),
+            role                    VARCHAR(20),
+            teamPosition            VARCHAR(20),
+            win                     TINYINT(1)   NOT NULL,
+            kills                   INT          NOT NULL,
+            deaths                  INT          NOT NULL,
+            assists                 INT          NOT NULL,
+            kda                     DOUBLE,
+            killParticipation       DOUBLE,
+            damagePerMinute         DOUBLE,
+            teamDamagePercentage    DOUBLE,
+            soloKills               INT,
+            goldPerMinute           DOUBLE,
+            visionScorePerMinute    DOUBLE,
+            goldEarned              INT          NOT NULL,
+            teamGoldEarned          INT          NOT NULL,
+            totalMinionsKilled      INT          NOT NULL,
+            neutralMinionsKilled    INT          NOT NULL,
+            visionScore             INT          NOT NULL,
+            wardsPlaced             INT          NOT NULL,
+            wardsKilled             INT          NOT NULL,
+            damageDealtToObjectives INT          NOT NULL,
+            damageDealtToTurrets    INT          NOT NULL,
+            turretTakedowns         INT          NOT NULL,
+            PRIMARY KEY (matchId, puuid),
+            KEY idx_participant_puuid (puuid, gameStartTimestamp),
+            KEY idx_participant_champion (championId)
+        )
+    """,
+    """ CREATE TABLE IF NOT EXISTS PlayerMatch (
+            puuid              VARCHAR(100) NOT NULL,
+            gameStartTimestamp BIGINT       NOT NULL,
+            matchId            VARCHAR(32)  NOT NULL,
+            PRIMARY KEY (puuid, gameStartTimestamp, matchId)
+        )
+    """,
+    """ CREATE TABLE IF NOT EXISTS RiotAccount (
+            gameName   VARCHAR(255) NOT NULL,
+            tagLine    VARCHAR(32)  NOT NULL,
+            puuid      VARCHAR(100) NOT NULL,
+            lastSeen   BIGINT       NOT NULL,
+            PRIMARY KEY (gameName, tagLine),
+            KEY idx_riot_account_puuid (puuid)
+        )
+    """,
+    """ CREATE TABLE IF NOT EXISTS MatchCard (
+            matchId            VARCHAR(32) NOT NULL PRIMARY KEY,
+            gameStartTimestamp BIGINT      NOT NULL,
+            card               JSON        NOT NULL
+        )
+    """,
+    # Per champion and position, {metric: quantile sketch} over every ingested game
+    """ CREATE TABLE IF NOT EXISTS ChampionStatSketch (
+            championId   INT         NOT NULL,
+            teamPosition VARCHAR(20) NOT NULL,
+            sketches     JSON        NOT NULL,
+            PRIMARY KEY (championId, teamPosition)
+        )
+    """,
+    # Sketches rebuild_champion_sketches builds up batch by batch, swapped into
+    # ChampionStatSketch once the scan reaches the last match
+    """ CREATE TABLE IF NOT EXISTS ChampionStatSketchRebuild (
+            championId   INT         NOT NULL,
+            teamPosition VARCHAR(20) NOT NULL,
+            sketches     JSON        NOT NULL,
+            PRIMARY KEY (championId, teamPosition)
+        )
+    """,
+    # Scan position of the rebuild in progress; no row when none is running
+    """ CREATE TABLE IF NOT EXISTS ChampionStatSketchRebuildState (
+            id          TINYINT     NOT NULL PRIMARY KEY,
+            lastMatchId VARCHAR(32) NOT NULL
+        )
+    """,
+    # Timelines in timeline_codec's compressed format; the API reads only this
+    # table. Timelines stored as JSON in MatchTimeline before it existed are
+    # moved here by compress_match_timelines, run once before deploying the API.
+    """ CREATE TABLE IF NOT EXISTS CompressedMatchTimeline (
+            matchId  VARCHAR(32) NOT NULL PRIMARY KEY,
+            timeline LONGBLOB    NOT NULL
+        )
+    """,
+    """ CREATE TABLE IF NOT EXISTS DataVersion (
+            scope     VARCHAR(32) NOT NULL PRIMARY KEY,
+            version   BIGINT      NOT NULL,
+            updatedAt TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3)
+        )
+    """,
+]
+schema_ready = False
+
 def lambda_handler(event, context):
     """
     This Lambda is triggered by SQS. event['Records'] contains SQS messages.
+    The whole batch is decoded first so match ids already stored are dropped with
+    one query per table, before any Riot call. The remaining matches and timelines
+    are fetched concurrently and written with one commit. Records whose fetch or
+    write failed are returned in batchItemFailures, so SQS retries them, as are
+    maintenance actions that raised.
     """
     # Connect to database once
     conn = get_connection()
     cursor = conn.cursor()
+    ensure_schema(conn, cursor)
 
+    messages = []
     for record in event['Records']:
         logger.info(f"Type of record['body']: {type(record['body'])}")
         logger.info(f"Content of record['body']: {record['body']}")
@@ -59,26 +205,72 @@ def lambda_handler(event, context):
             if isinstance(data, str):
                 data = json.loads(data)
 
-            if isinstance(data, dict):
-                data_item = data
+            data_item = data if isinstance(data, dict) else {}
             
             logger.info(f"Action: {action}, data: {data}")
+            messages.append((record, action, data_item))
+        except Exception as e:
+            logger.exception(f"Failed to decode message: {record['body']}")
 
+    try:
+        new_match_ids = pending_match_ids(cursor, messages, 'create_match_data', 'MatchData')
+        new_timeline_ids = pending_match_ids(cursor, messages, 'create_match_timeline', 'CompressedMatchTimeline')
+    except Exception as e:
+        # Fall back to fetching everything; the inserts are INSERT IGNORE
+        logger.exception("Failed to check the batch's match ids against the database")
+        new_match_ids = {data.get('match_id') for _, action, data in messages if action == 'create_match_data'}
+        new_timeline_ids = {data.get('match_id') for _, action, data in messages if action == 'create_match_timeline'}
+
+    logger.info(f"Batch of {len(event['Records'])} records: fetching {len(new_match_ids)} matches "
+                f"and {len(new_timeline_ids)} timelines")
+
+    # Each id is fetched once even if the batch asks for it twice
+    deadline = time.time() + RIOT_BATCH_TIMEOUT
+    fetches = {}
+    for match_id in new_match_ids:
+        fetches[riot_pool.submit(fetch_match_data, match_id, deadline)] = ('match', match_id)
+    for match_id in new_timeline_ids:
+        fetches[riot_pool.submit(fetch_match_timeline_data, match_id, deadline)] = ('timeline', match_id)
+
+    # (kind, matchId) pairs to retry
+    fetched, failed = await_riot_fetches(fetches, deadline)
+    try:
+        if fetched['match']:
+            failed.update(('match', match_id) for match_id in insert_matches(cursor, fetched['match']))
+        if fetched['timeline']:
+            insert_match_timelines(cursor, fetched['timeline'])
+        conn.commit()
+    except Exception as e:
+        logger.exception("Failed to commit match batch")
+        conn.rollback()
+        failed.update(('match', match_id) for match_id in fetched['match'])
+        failed.update(('timeline', match_id) for match_id in fetched['timeline'])
+
+    batch_item_failures = []
+    for record, action, data_item in messages:
+        try:
             # Handle different actions based on the message
             if action == 'create_match_data':
-                match_id = data_item['match_id']
-                upsert_match_data(match_id, conn, cursor)
+                if ('match', data_item.get('match_id')) in failed:
+                    batch_item_failures.append(record['messageId'])
             elif action == 'create_match_timeline':
-                match_id = data_item['match_id']
-                upsert_match_timeline(match_id, conn, cursor)
+                if ('timeline', data_item.get('match_id')) in failed:
+                    batch_item_failures.append(record['messageId'])
             elif action == 'create_all_aggregate_champion_stats':
                 upsert_all_aggregate_champion_stats(conn, cursor)
+            elif action == 'rebuild_champion_sketches':
+                rebuild_champion_sketches(conn, cursor, after=data_item.get('after', ''), limit=data_item.get('limit', 200))
+            elif action == 'compress_match_timelines':
+                compress_match_timelines(conn, cursor, after=data_item.get('after', ''), limit=data_item.get('limit', 200))
+            elif action == 'backfill_match_index':
+                backfill_match_index(conn, cursor, after=data_item.get('after', ''), limit=data_item.get('limit', 200))
             else:
                 logger.warning(f"Unknown action: {action}")
                 
         except Exception as e:
             # Log and handle any errors that occur during message processing
             logger.exception(f"Failed to process message: {record['body']}")
+            batch_item_failures.append(record['messageId'])
 
     if cursor:
         cursor.close()
@@ -86,8 +278,7 @@ def lambda_handler(event, context):
         conn.close()
 
     return {
-        'statusCode': 200,
-        'body': json.dumps('Success')
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in batch_item_failures]
     }
 
 def get_connection():
@@ -99,44 +290,525 @@ def get_connection():
         database=rds_db
     )
 
-def upsert_match_data(match_id, conn, cursor):
-    try:
-        # Check if match data already exists
-        cursor.execute("SELECT * FROM MatchData WHERE matchId = %s", (match_id,))
-        existing_match = cursor.fetchone()
-        if existing_match:
-            logger.info(f"Match data already exists for matchID: {match_id}")
-            return
-        
-        match_data = json.dumps(fetch_match_data(match_id))
-        cursor.execute(
-            """ INSERT IGNORE INTO MatchData( matchId, matchData )
-                VALUES (%s, %s)
-            """,
-            (match_id, match_data)
+def ensure_schema(conn, cursor):
+    """ Creates the ingest-derived tables once per container
+    """
+    global schema_ready
+    if schema_ready:
+        return
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    conn.commit()
+    schema_ready = True
+
+def bump_data_version(cursor, scope):
+    """ Marks `scope` as changed so the API revalidates and evicts what it cached.
+        Call inside the write's transaction.
+    """
+    cursor.execute(
+        """ INSERT INTO DataVersion (scope, version) VALUES (%s, 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+        """,
+        (scope,)
+    )
+
+def queue_match_action(action, data):
+    """ Sends {"action", "data"} to the match queue, e.g. a maintenance action's next batch
+    """
+    global match_queue_url
+    if not match_queue_url:
+        match_queue_url = sqs.get_queue_url(QueueName='match')['QueueUrl']
+    sqs.send_message(
+        QueueUrl=match_queue_url,
+        MessageBody=json.dumps({"action": action, "data": data})
+    )
+    logger.info(f"Queued {action} with data: {data}")
+
+def pending_match_ids(cursor, messages, action, *tables):
+    """ Returns the match ids requested by the batch's `action` messages that none of `tables` has yet
+        Params: messages: [(record, action, data), ...]
+    """
+    requested = {data.get('match_id') for _, message_action, data in messages if message_action == action}
+    requested.discard(None)
+    for table in tables:
+        if not requested:
+            break
+        requested -= existing_match_ids(cursor, table, requested)
+    return requested
+
+def existing_match_ids(cursor, table, match_ids):
+    """ Returns which of `match_ids` are already stored in `table`, with one primary key lookup
+    """
+    placeholders = ", ".join(["%s"] * len(match_ids))
+    cursor.execute(f"SELECT matchId FROM {table} WHERE matchId IN ({placeholders})", tuple(match_ids))
+    return {row[0] for row in cursor.fetchall()}
+
+def await_riot_fetches(fetches, deadline):
+    """ Waits for the batch's pooled Riot fetches, which give up at `deadline`
+        Params: fetches: {future: (kind, matchId)}, kind being 'match' or 'timeline'
+        Return: ({'match': {matchId: match}, 'timeline': {matchId: timeline}},
+                 {(kind, matchId) of fetches to retry})
+    """
+    results = {'match': {}, 'timeline': {}}
+    failed = set()
+    # A request in flight at the deadline can take up to RIOT_REQUEST_TIMEOUT more
+    done, not_done = wait(fetches, timeout=max(0, deadline - time.time()) + RIOT_REQUEST_TIMEOUT)
+    for future in not_done:
+        # Left running: it stops on its own, but its result comes too late for this batch
+        kind, match_id = fetches[future]
+        logger.error(f"Timed out fetching {kind} for matchID: {match_id}")
+        failed.add((kind, match_id))
+    for future in done:
+        kind, match_id = fetches[future]
+        try:
+            data = future.result()
+        except Exception as e:
+            logger.exception(f"Failed to fetch {kind} for matchID: {match_id}")
+            failed.add((kind, match_id))
+            continue
+        if not data:
+            # Riot has no such match; retrying won't change that
+            logger.error(f"No {kind} returned for matchID: {match_id}")
+            continue
+        results[kind][match_id] = data
+    return results, failed
+
+def insert_matches(cursor, matches):
+    """ Writes fetched matches and, for the ones this batch inserted, their index rows.
+        Each match gets its own savepoint: one whose write fails is left out, so a
+        retry fetches it anew. Runs in the caller's transaction.
+        Params: matches: {matchId: match}
+        Return: the matchIds that failed
+    """
+    failed = []
+    inserted = 0
+    for match_id, match in matches.items():
+        cursor.execute("SAVEPOINT match_insert")
+        try:
+            cursor.execute(
+                """ INSERT IGNORE INTO MatchData( matchId, matchData )
+                    VALUES (%s, %s)
+                """,
+                (match_id, json.dumps(match))
             )
-        conn.commit()
-        match = cursor.fetchone()
-        logger.info(f"✅ Inserted matchID: {match_id} into MatchData table!")
-        return match
-    except Exception as e:
-        logger.exception(f"Failed to insert match data: {match_id}")
+            # Only index the match if this batch actually inserted it. A batch storing
+            # the same match concurrently waits on the row lock, then inserts nothing.
+            if cursor.rowcount == 1:
+                index_match_data(cursor, match_id, match)
+                inserted += 1
+            cursor.execute("RELEASE SAVEPOINT match_insert")
+        except Exception as e:
+            logger.exception(f"Failed to insert matchID: {match_id}")
+            cursor.execute("ROLLBACK TO SAVEPOINT match_insert")
+            failed.append(match_id)
+
+    if inserted:
+        bump_data_version(cursor, 'match')
+    logger.info(f"✅ Inserted {inserted} matches into MatchData table!")
+    return failed
+
+def index_match_data(cursor, match_id, match):
+    """ Writes the typed rows derived from one match document.
+        Runs in the caller's transaction so the match and its index commit together.
+    """
+    new_puuids = insert_participant_stats(cursor, match_id, match)
+    insert_player_matches(cursor, match_id, match)
+    upsert_match_card(cursor, match_id, match)
+    # Only participants seen for the first time, so re-indexing never double counts
+    update_champion_sketches(cursor, match_id, match, new_puuids)
+
+def build_participant_stats_rows(match_id, match):
+    """ Returns one ParticipantStats row per participant in a Riot match document
+        Params: match_id: str, match: dict (match-v5 response)
+        Return: [(matchId, puuid, participantId, ...), ...]
+    """
+    info = match.get('info', {})
+    participants = info.get('participants', [])
+
+    team_gold = {}
+    for p in participants:
+        team_gold[p['teamId']] = team_gold.get(p['teamId'], 0) + p.get('goldEarned', 0)
+
+    rows = []
+    for p in participants:
+        challenges = p.get('challenges') or {}
+        rows.append((
+            match_id,
+            p['puuid'],
+            p.get('participantId', 0),
+            p['teamId'],
+            info.get('gameStartTimestamp', 0),
+            info.get('gameDuration', 0),
+            p.get('championId', 0),
+            p.get('championName', ''),
+            p.get('riotIdGameName'),
+            p.get('riotIdTagline'),
+            p.get('lane'),
+            p.get('role'),
+            p.get('teamPosition'),
+            bool(p.get('win')),
+            p.get('kills', 0),
+            p.get('deaths', 0),
+            p.get('assists', 0),
+            challenges.get('kda'),
+            challenges.get('killParticipation'),
+            challenges.get('damagePerMinute'),
+            challenges.get('teamDamagePercentage'),
+            challenges.get('soloKills'),
+            challenges.get('goldPerMinute'),
+            challenges.get('visionScorePerMinute'),
+            p.get('goldEarned', 0),
+            team_gold[p['teamId']],
+            p.get('totalMinionsKilled', 0),
+            p.get('neutralMinionsKilled', 0),
+            p.get('visionScore', 0),
+            p.get('wardsPlaced', 0),
+            p.get('wardsKilled', 0),
+            p.get('damageDealtToObjectives', 0),
+            p.get('damageDealtToTurrets', 0),
+            p.get('turretTakedowns', 0),
+        ))
+    return rows
+
+def insert_participant_stats(cursor, match_id, match):
+    """ Inserts the match's ParticipantStats rows that don't exist yet
+        Return: the puuids whose rows were inserted
+    """
+    rows = build_participant_stats_rows(match_id, match)
+    if not rows:
+        logger.warning(f"No participants found in matchID: {match_id}")
+        return []
+    cursor.execute("SELECT puuid FROM ParticipantStats WHERE matchId = %s", (match_id,))
+    existing = {row[0] for row in cursor.fetchall()}
+    rows = [row for row in rows if row[1] not in existing]
+    if not rows:
+        return []
+    cursor.executemany(
+        """ INSERT IGNORE INTO ParticipantStats (
+                matchId, puuid, participantId, teamId, gameStartTimestamp, gameDuration,
+                championId, championName, riotIdGameName, riotIdTagline, lane, role, teamPosition,
+                win, kills, deaths, assists, kda, killParticipation, damagePerMinute,
+                teamDamagePercentage, soloKills, goldPerMinute, visionScorePerMinute,
+                goldEarned, teamGoldEarned, totalMinionsKilled, neutralMinionsKilled,
+                visionScore, wardsPlaced, wardsKilled, damageDealtToObjectives,
+                damageDealtToTurrets, turretTakedowns
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        rows
+    )
+    logger.info(f"✅ Inserted {len(rows)} participants of matchID: {match_id} into ParticipantStats table!")
+    return [row[1] for row in rows]
+
+def insert_player_matches(cursor, match_id, match):
+    """ Indexes the match under every participant's puuid and records each
+        participant's Riot ID, so /match-history can resolve a player with index reads
+    """
+    info = match.get('info', {})
+    game_start = info.get('gameStartTimestamp', 0)
+    participants = info.get('participants', [])
+
+    cursor.executemany(
+        """ INSERT IGNORE INTO PlayerMatch (puuid, gameStartTimestamp, matchId)
+            VALUES (%s, %s, %s)
+        """,
+        [(p['puuid'], game_start, match_id) for p in participants]
+    )
+
+    accounts = [
+        (p['riotIdGameName'], p['riotIdTagline'], p['puuid'], game_start)
+        for p in participants
+        if p.get('riotIdGameName') and p.get('riotIdTagline')
+    ]
+    if accounts:
+        # A Riot ID can move to another account; keep the most recently seen owner
+        cursor.executemany(
+            """ INSERT INTO RiotAccount (gameName, tagLine, puuid, lastSeen)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    puuid = IF(VALUES(lastSeen) >= lastSeen, VALUES(puuid), puuid),
+                    lastSeen = GREATEST(lastSeen, VALUES(lastSeen))
+            """,
+            accounts
+        )
 
-def upsert_match_timeline(match_id, conn, cursor):
+def upsert_match_card(cursor, match_id, match):
+    """ Stores the prebuilt /match-history card. Re-indexing re-renders it, so a
+        backfill picks up changes to the card format.
+    """
+    card = build_match_card(match_id, match)
+    cursor.execute(
+        """ INSERT INTO MatchCard (matchId, gameStartTimestamp, card)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE card = VALUES(card)
+        """,
+        (match_id, match.get('info', {}).get('gameStartTimestamp', 0), json.dumps(card))
+    )
+
+def collect_sketch_values(updates, match, puuids=None):
+    """ Groups the match participants' metric values by (championId, teamPosition),
+        adding each to its position's entry and to the champion's ALL_POSITIONS entry
+        Params: updates: {(championId, teamPosition): {metric: [values]}}, filled in place
+                puuids: only these participants; None for all
+    """
+    info = match.get('info', {})
+    team_gold = team_gold_earned(info)
+    for p in info.get('participants', []):
+        if puuids is not None and p.get('puuid') not in puuids:
+            continue
+        metrics = participant_metrics(p, info, team_gold)
+        for position in {p.get('teamPosition') or '', ALL_POSITIONS}:
+            values = updates.setdefault((p.get('championId', 0), position), {})
+            for name, value in metrics.items():
+                values.setdefault(name, []).append(value)
+    return updates
+
+def add_sketch_values(sketches, values):
+    """ Adds {metric: [values]} to a row's {metric: sketch} in place
+    """
+    for name, metric_values in values.items():
+        sketch = sketches.setdefault(name, new_sketch())
+        for value in metric_values:
+            add_value(sketch, value)
+    return sketches
+
+def update_champion_sketches(cursor, match_id, match, puuids):
+    """ Adds the given participants' per-game values to their champions' quantile sketches.
+        While a rebuild is running, a match its scan has already passed is added to
+        ChampionStatSketchRebuild too, so the swap doesn't drop it.
+    """
+    if not puuids:
+        return
+    updates = collect_sketch_values({}, match, set(puuids))
+    # Shared lock on the scan position, taken before any sketch row, so a rebuild
+    # batch can't move past this match or swap until this transaction commits
+    cursor.execute(
+        "SELECT lastMatchId >= %s FROM ChampionStatSketchRebuildState WHERE id = 1 FOR SHARE",
+        (match_id,)
+    )
+    rebuild = cursor.fetchone()
+    merge_sketch_values(cursor, 'ChampionStatSketch', updates)
+    if rebuild and rebuild[0]:
+        merge_sketch_values(cursor, 'ChampionStatSketchRebuild', updates)
+
+def merge_sketch_values(cursor, table, updates):
+    """ Adds {(championId, teamPosition): {metric: [values]}} to the sketch rows of `table`.
+        Rows are locked in primary key order, so concurrent ingests don't lose updates.
+    """
+    if not updates:
+        return
+    keys = sorted(updates)
+
+    cursor.executemany(
+        f"INSERT IGNORE INTO {table} (championId, teamPosition, sketches) VALUES (%s, %s, %s)",
+        [(champion_id, position, '{}') for champion_id, position in keys]
+    )
+    placeholders = ", ".join(["(%s, %s)"] * len(keys))
+    cursor.execute(
+        f""" SELECT championId, teamPosition, sketches
+             FROM {table}
+             WHERE (championId, teamPosition) IN ({placeholders})
+             ORDER BY championId, teamPosition
+             FOR UPDATE
+        """,
+        tuple(value for key in keys for value in key)
+    )
+
+    rows = []
+    for champion_id, position, sketches_json in cursor.fetchall():
+        sketches = add_sketch_values(json.loads(sketches_json), updates[(champion_id, position)])
+        rows.append((json.dumps(sketches), champion_id, position))
+    cursor.executemany(
+        f"UPDATE {table} SET sketches = %s WHERE championId = %s AND teamPosition = %s",
+        rows
+    )
+
+def rebuild_champion_sketches(conn, cursor, after='', limit=200, batch_size=50):
+    """ Rebuilds every ChampionStatSketch row from the stored MatchData, e.g. to cover
+        matches ingested before sketches existed, while ingest keeps running. Matches
+        are folded into ChampionStatSketchRebuild in matchId order, one commit per batch,
+        with the scan position kept in ChampionStatSketchRebuildState; ingest adds the
+        matches the scan has passed to the rebuild as well (see update_champion_sketches).
+        The batch that reaches the last match swaps the rebuilt rows in.
+        An empty `after` starts over. Otherwise the scan continues from the stored
+        position, so a redelivered message doesn't fold a match twice. After `limit`
+        matches the next batch is queued with the position in `after`.
+        Return: the last matchId folded, or None once the rebuild is swapped in
+    """
+    folded = 0
+    last_match_id = after
     try:
-        match_timeline_data = json.dumps(fetch_match_timeline_data(match_id))
+        if not after:
+            cursor.execute("DELETE FROM ChampionStatSketchRebuild")
+            cursor.execute(
+                """ INSERT INTO ChampionStatSketchRebuildState (id, lastMatchId) VALUES (1, '')
+                    ON DUPLICATE KEY UPDATE lastMatchId = ''
+                """
+            )
+            conn.commit()
+
+        while True:
+            # Ingest holds this row shared while it writes sketches
+            cursor.execute("SELECT lastMatchId FROM ChampionStatSketchRebuildState WHERE id = 1 FOR UPDATE")
+            state = cursor.fetchone()
+            if state is None:
+                conn.commit()
+                logger.warning(f"No champion sketch rebuild in progress, ignoring continuation after matchID: {after}")
+                return None
+            last_match_id = state[0]
+            if folded >= limit:
+                conn.commit()
+                queue_match_action('rebuild_champion_sketches', {'after': last_match_id, 'limit': limit})
+                logger.info(f"Folded {folded} matches into the champion sketch rebuild, last matchID: {last_match_id}")
+                return last_match_id
+
+            requested = min(batch_size, limit - folded)
+            cursor.execute(
+                """ SELECT matchId, matchData
+                    FROM MatchData
+                    WHERE matchId > %s
+                    ORDER BY matchId
+                    LIMIT %s
+                """,
+                (last_match_id, requested)
+            )
+            rows = cursor.fetchall()
+            updates = {}
+            for match_id, match_data in rows:
+                if match_data:
+                    collect_sketch_values(updates, json.loads(match_data))
+            merge_sketch_values(cursor, 'ChampionStatSketchRebuild', updates)
+            if rows:
+                last_match_id = rows[-1][0]
+            folded += len(rows)
+            if len(rows) < requested:
+                break
+            cursor.execute(
+                "UPDATE ChampionStatSketchRebuildState SET lastMatchId = %s WHERE id = 1",
+                (last_match_id,)
+            )
+            conn.commit()
+
+        # Still holding the state row, so no ingest writes sketches until the swap commits
+        cursor.execute("DELETE FROM ChampionStatSketch")
         cursor.execute(
-            """ INSERT IGNORE INTO MatchTimeline(matchId, matchTimeline)
-                VALUES (%s, %s)
-            """,
-            (match_id, match_timeline_data)
+            """ INSERT INTO ChampionStatSketch (championId, teamPosition, sketches)
+                SELECT championId, teamPosition, sketches FROM ChampionStatSketchRebuild
+            """
         )
+        swapped = cursor.rowcount
+        cursor.execute("DELETE FROM ChampionStatSketchRebuild")
+        cursor.execute("DELETE FROM ChampionStatSketchRebuildState")
+        bump_data_version(cursor, 'match')
         conn.commit()
-        match_timeline = cursor.fetchone()
-        logger.info(f"✅ Inserted matchID: {match_id} into MatchTimeline table!")
-        return match_timeline
+        logger.info(f"✅ Rebuilt {swapped} champion stat sketches, last matchID: {last_match_id}")
+        return None
     except Exception as e:
-        logger.exception(f"Failed to insert match timeline: {match_id}")
+        conn.rollback()
+        logger.exception(f"Failed to rebuild champion stat sketches after matchID: {last_match_id}")
+        raise
+
+def backfill_match_index(conn, cursor, after='', limit=200, batch_size=20):
+    """ Re-indexes stored matches in matchId order, starting after `after`.
+        Index writes are idempotent, so re-running over indexed matches is safe.
+        After `limit` matches the next batch is queued with the last matchId in `after`.
+    """
+    indexed = 0
+    last_match_id = after
+    try:
+        while indexed < limit:
+            cursor.execute(
+                """ SELECT matchId, matchData
+                    FROM MatchData
+                    WHERE matchId > %s
+                    ORDER BY matchId
+                    LIMIT %s
+                """,
+                (last_match_id, min(batch_size, limit - indexed))
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for match_id, match_data in rows:
+                last_match_id = match_id
+                match = json.loads(match_data) if match_data else None
+                if not match:
+                    logger.warning(f"Skipping empty matchData for matchID: {match_id}")
+                    continue
+                index_match_data(cursor, match_id, match)
+            bump_data_version(cursor, 'match')
+            conn.commit()
+            indexed += len(rows)
+        logger.info(f"✅ Backfilled match index for {indexed} matches, last matchID: {last_match_id}")
+        if indexed >= limit:
+            queue_match_action('backfill_match_index', {'after': last_match_id, 'limit': limit})
+        return last_match_id
+    except Exception as e:
+        conn.rollback()
+        logger.exception(f"Failed to backfill match index after matchID: {last_match_id}")
+        raise
+
+def insert_match_timelines(cursor, timelines):
+    """ Writes fetched timelines, compressed, with one multi-row insert. Runs in the caller's transaction.
+        Params: timelines: {matchId: timeline}
+    """
+    cursor.executemany(
+        """ INSERT IGNORE INTO CompressedMatchTimeline(matchId, timeline)
+            VALUES (%s, %s)
+        """,
+        [(match_id, encode_timeline(match_id, timeline)) for match_id, timeline in timelines.items()]
+    )
+    logger.info(f"✅ Inserted {len(timelines)} timelines into CompressedMatchTimeline table!")
+
+def compress_match_timelines(conn, cursor, after='', limit=200, batch_size=10):
+    """ Moves timelines stored as JSON in MatchTimeline into CompressedMatchTimeline,
+        in matchId order starting after `after`. Each batch commits on its own.
+        After `limit` timelines the next batch is queued with the last matchId in `after`.
+    """
+    moved = 0
+    last_match_id = after
+    try:
+        while moved < limit:
+            cursor.execute(
+                """ SELECT matchId, matchTimeline
+                    FROM MatchTimeline
+                    WHERE matchId > %s
+                    ORDER BY matchId
+                    LIMIT %s
+                """,
+                (last_match_id, min(batch_size, limit - moved))
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_match_id = rows[-1][0]
+            compressed = []
+            for match_id, timeline in rows:
+                # Timelines a failed fetch stored as null are dropped, so they can be fetched again
+                document = json.loads(timeline) if timeline else None
+                if document:
+                    compressed.append((match_id, encode_timeline(match_id, document)))
+            if compressed:
+                cursor.executemany(
+                    "INSERT IGNORE INTO CompressedMatchTimeline(matchId, timeline) VALUES (%s, %s)",
+                    compressed
+                )
+            placeholders = ", ".join(["%s"] * len(rows))
+            cursor.execute(
+                f"DELETE FROM MatchTimeline WHERE matchId IN ({placeholders})",
+                tuple(match_id for match_id, _ in rows)
+            )
+            conn.commit()
+            moved += len(rows)
+        logger.info(f"✅ Compressed {moved} match timelines, last matchID: {last_match_id}")
+        if moved >= limit:
+            queue_match_action('compress_match_timelines', {'after': last_match_id, 'limit': limit})
+        return last_match_id
+    except Exception as e:
+        conn.rollback()
+        logger.exception(f"Failed to compress match timelines after matchID: {last_match_id}")
+        raise
 
 def upsert_all_aggregate_champion_stats(conn, cursor):
     """ Returns aggregate stats for all champions
@@ -161,78 +833,23 @@ def upsert_all_aggregate_champion_stats(conn, cursor):
                 games_played
             )
             SELECT
-                p.championKey AS champion_id,
+                p.championId AS champion_id,
                 p.championName AS champion_name,
-                AVG(p.kp) AS kp,
-                AVG(p.dpm) AS dpm,
+                AVG(p.killParticipation) AS kp,
+                AVG(p.damagePerMinute) AS dpm,
                 AVG(p.soloKills) AS solo_kills,
-                AVG(p.dmgPercent) AS dmg_percent,
-                AVG(p.gpm) AS gpm,
-                AVG((p.total_cs + p.neutral_cs) / (j.gameDuration / 60)) AS cspm,
-                AVG(p.player_gold / t.team_gold) AS gold_percentage,
-                AVG(p.vpm) AS avg_vpm,
+                AVG(p.teamDamagePercentage) AS dmg_percent,
+                AVG(p.goldPerMinute) AS gpm,
+                AVG((p.totalMinionsKilled + p.neutralMinionsKilled) / (p.gameDuration / 60)) AS cspm,
+                AVG(p.goldEarned / p.teamGoldEarned) AS gold_percentage,
+                AVG(p.visionScorePerMinute) AS avg_vpm,
                 AVG(p.visionScore) AS avg_vision_score,
-                AVG(p.wardsCleared) AS avg_wards_cleared,
-                AVG(p.damageToTurrets) AS avg_dmg_to_turrets,
+                AVG(p.wardsKilled) AS avg_wards_cleared,
+                AVG(p.damageDealtToTurrets) AS avg_dmg_to_turrets,
                 AVG(p.turretTakedowns) AS avg_turret_takedowns,
                 COUNT(*) AS games_played
-            FROM MatchData m
-            -- extract participant stats
-            JOIN JSON_TABLE(
-                m.matchData,
-                '$.info.participants[*]'
-                COLUMNS (
-                    championName        VARCHAR(100) PATH '$.championName',
-                    championKey         VARCHAR(10)  PATH '$.championId',
-
-                    kp                  DOUBLE PATH '$.challenges.killParticipation',
-                    dpm                 DOUBLE PATH '$.challenges.damagePerMinute',
-                    soloKills           DOUBLE PATH '$.challenges.soloKills',
-                    dmgPercent          DOUBLE PATH '$.challenges.teamDamagePercentage',
-
-                    gpm                 DOUBLE PATH '$.challenges.goldPerMinute',
-
-                    vpm                 DOUBLE PATH '$.challenges.visionScorePerMinute',
-                    visionScore         DOUBLE PATH '$.visionScore',
-                    wardsCleared        DOUBLE PATH '$.wardsKilled',
-
-                    damageToTurrets     DOUBLE PATH '$.damageDealtToTurrets',
-                    turretTakedowns     DOUBLE PATH '$.turretTakedowns',
-
-                    total_cs            INT PATH '$.totalMinionsKilled',
-                    neutral_cs          INT PATH '$.neutralMinionsKilled',
-
-                    puuid               VARCHAR(100) PATH '$.puuid',
-                    player_gold         DOUBLE PATH '$.goldEarned',
-                    teamId              INT PATH '$.teamId'
-                )
-            ) AS p
-            -- extract game duration
-            JOIN JSON_TABLE(
-                m.matchData,
-                '$.info'
-                COLUMNS (
-                    gameDuration DOUBLE PATH '$.gameDuration'
-                )
-            ) AS j
-            -- compute total team gold per match
-            JOIN (
-                SELECT 
-                    m2.matchId,
-                    p3.teamId,
-                    SUM(p3.gold) AS team_gold
-                FROM MatchData m2
-                JOIN JSON_TABLE(
-                    m2.matchData,
-                    '$.info.participants[*]'
-                    COLUMNS (
-                        gold DOUBLE PATH '$.goldEarned',
-                        teamId INT PATH '$.teamId'
-                    )
-                ) AS p3
-                GROUP BY m2.matchId, p3.teamId
-            ) AS t ON t.matchId = m.matchId AND t.teamId = p.teamId
-            GROUP BY p.championKey, p.championName
+            FROM ParticipantStats p
+            GROUP BY p.championId, p.championName
             ON DUPLICATE KEY UPDATE
                 champion_name        = VALUES(champion_name),
                 kp                   = VALUES(kp),
@@ -250,6 +867,7 @@ def upsert_all_aggregate_champion_stats(conn, cursor):
                 games_played         = VALUES(games_played),
                 last_updated         = CURRENT_TIMESTAMP;
             """)
+        bump_data_version(cursor, 'champion_stats')
         conn.commit()
         logger.info(f"✅ Inserted all champion stats into AggregateChampionStats Table")
     except Exception as e:
@@ -423,40 +1041,63 @@ def fetch_match_ids(puuid, startTime=None, endTime=None, queue=700, type_=None,
 
     return None
 
-def fetch_match_data(matchId):
+def fetch_match_data(matchId, deadline):
     url = f"https://americas.api.riotgames.com/lol/match/v5/matches/{matchId}"
-    req = urllib.request.Request(url)
-
-    # Add headers
-    for k,v in STATS_HEADERS.items():
-        req.add_header(k, v)
-
-    try:
-        with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            return data
-    except urllib.error.HTTPError as e:
-        logger.error(f"HTTPError: {e.code} - {e.reason}")
-    except urllib.error.URLError as e:
-        logger.error(f"URLError: {e.reason}")
-
-    return None
+    return fetch_riot_json(url, deadline)
 
-def fetch_match_timeline_data(matchId):
+def fetch_match_timeline_data(matchId, deadline):
     url = f"https://americas.api.riotgames.com/lol/match/v5/matches/{matchId}/timeline"
+    return fetch_riot_json(url, deadline)
+
+def fetch_riot_json(url, deadline):
+    """ GETs a Riot document, sharing Riot's 429 back-off with the other fetches and
+        retrying until `deadline`
+        Return: the document, or None when Riot has none (404)
+        Raises: RiotFetchError when the fetch should be retried later
+    """
     req = urllib.request.Request(url)
 
     # Add headers
     for k,v in STATS_HEADERS.items():
         req.add_header(k, v)
 
+    while True:
+        wait_for_rate_limit(deadline)
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise RiotFetchError(f"Batch deadline passed before fetching {url}")
+        try:
+            with urllib.request.urlopen(req, timeout=min(RIOT_REQUEST_TIMEOUT, remaining)) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                logger.error(f"HTTPError: {e.code} - {e.reason}")
+                return None
+            if e.code != 429:
+                raise RiotFetchError(f"HTTPError: {e.code} - {e.reason}")
+            logger.warning(f"Rate limited by Riot, Retry-After: {e.headers.get('Retry-After')}")
+            back_off(e.headers.get('Retry-After'))
+        except (OSError, ValueError) as e:
+            # URLError, socket timeouts and truncated bodies
+            raise RiotFetchError(f"Failed to fetch {url}: {e}")
+
+def back_off(retry_after):
+    """ Holds every fetch in the container until Retry-After seconds from now
+    """
+    global riot_retry_at
     try:
-        with urllib.request.urlopen(req, timeout=5) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            return data
-    except urllib.error.HTTPError as e:
-        logger.error(f"HTTPError: {e.code} - {e.reason}")
-    except urllib.error.URLError as e:
-        logger.error(f"URLError: {e.reason}")
+        seconds = float(retry_after)
+    except (TypeError, ValueError):
+        seconds = RIOT_DEFAULT_RETRY_AFTER
+    with riot_retry_lock:
+        riot_retry_at = max(riot_retry_at, time.time() + seconds)
 
-    return None
+def wait_for_rate_limit(deadline):
+    """ Sleeps out a Retry-After back-off, or raises RiotFetchError if it outlasts `deadline`
+    """
+    retry_at = riot_retry_at
+    if retry_at <= time.time():
+        return
+    if retry_at >= deadline:
+        raise RiotFetchError(f"Rate limited by Riot for {retry_at - time.time():.0f}s more")
+    time.sleep(max(0, retry_at - time.time()))
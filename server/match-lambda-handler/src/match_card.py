@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+import logging
+from static_data import get_static_data
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+def build_match_card(match_id, match):
+    """ Renders the /match-history card for one match. Matches never change after
+        ingest, so the card is built once here and served as-is by the API.
+        Params: match_id: str, match: dict (match-v5 response)
+        Return: { matchId, gameCreation, gameDuration, participants: [...] }
+    """
+    info = match.get('info', {})
+    # Names come from the snapshot of the patch the match was played on
+    static_data = get_static_data(info.get('gameVersion'))
+    team_gold = team_gold_earned(info)
+
+    participants = []
+    for p in info.get('participants', []):
+        styles = (p.get('perks') or {}).get('styles') or []
+        primary = styles[0] if len(styles) > 0 else {}
+        secondary = styles[1] if len(styles) > 1 else {}
+        keystone = (primary.get('selections') or [{}])[0].get('perk')
+        kda = (p.get('challenges') or {}).get('kda')
+
+        participants.append({
+            'puuid': p.get('puuid'),
+            'player': p.get('riotIdGameName'),
+            'championId': p.get('championId'),
+            'champion': p.get('championName') or static_data.champion_name(p.get('championId')),
+            'outcome': int(bool(p.get('win'))),
+            'lane': format_lane(p.get('lane'), p.get('role')),
+            'teamPosition': p.get('teamPosition') or '',
+            'summonerSpells': [{
+                0: static_data.spell_name(p.get('summoner1Id')),
+                1: static_data.spell_name(p.get('summoner2Id'))
+            }],
+            'runes': {
+                'primary': static_data.rune_name(primary.get('style')),
+                'keystone': static_data.rune_name(keystone),
+                'secondary': static_data.rune_name(secondary.get('style'))
+            },
+            'kda': {
+                'kda': round(kda, 2) if kda is not None else None,
+                'kills': p.get('kills', 0),
+                'deaths': p.get('deaths', 0),
+                'assists': p.get('assists', 0)
+            },
+            'items': {f'item{idx}': p.get(f'item{idx}', 0) for idx in range(7)},
+            'teamId': p.get('teamId'),
+            # Raw values the API ranks against the champion's percentile sketches
+            'metrics': participant_metrics(p, info, team_gold)
+        })
+
+    return {
+        'matchId': match_id,
+        'gameCreation': format_game_creation(info.get('gameStartTimestamp', 0)),
+        'gameDuration': format_game_duration(info.get('gameDuration', 0)),
+        'participants': participants
+    }
+
+def team_gold_earned(info):
+    team_gold = {}
+    for p in info.get('participants', []):
+        team_gold[p.get('teamId')] = team_gold.get(p.get('teamId'), 0) + p.get('goldEarned', 0)
+    return team_gold
+
+def participant_metrics(p, info, team_gold):
+    """ Returns the per-game values kept in ChampionStatSketch for one participant
+        Return: {kda, dpm, cspm, vpm, gold_share, odpm}; None where the match lacks the data
+    """
+    challenges = p.get('challenges') or {}
+    minutes = info.get('gameDuration', 0) / 60
+    gold = team_gold.get(p.get('teamId'))
+    return {
+        'kda': challenges.get('kda'),
+        'dpm': challenges.get('damagePerMinute'),
+        'cspm': (p.get('totalMinionsKilled', 0) + p.get('neutralMinionsKilled', 0)) / minutes if minutes else None,
+        'vpm': challenges.get('visionScorePerMinute'),
+        'gold_share': p.get('goldEarned', 0) / gold if gold else None,
+        'odpm': p.get('damageDealtToObjectives', 0) / minutes if minutes else None,
+    }
+
+def format_lane(lane, role):
+    """ Splits BOTTOM into ADC and SUPPORT using the participant's role
+    """
+    if lane == 'BOTTOM':
+        if role == 'CARRY':
+            return 'ADC'
+        elif role == 'SUPPORT':
+            return 'SUPPORT'
+    return lane
+
+def format_game_creation(game_start_timestamp):
+    game_datetime = datetime.fromtimestamp(int(game_start_timestamp) / 1000, tz=timezone.utc)
+    return game_datetime.strftime("%Y-%m-%d %H:%M:%S")
+
+def format_game_duration(game_duration):
+    minutes = game_duration // 60
+    seconds = game_duration % 60
+    return f"{minutes}:{seconds:02d}"
@@ -0,0 +1,74 @@
+import json
+import os
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Data Dragon snapshots bundled with the Lambda, one file per patch
+# (built by server/scripts/build_static_data.py)
+STATIC_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static_data')
+
+# Loaded once per container, keyed by snapshot version
+registries = {}
+
+class StaticData:
+    """ Integer-indexed lookups for one Data Dragon snapshot
+    """
+
+    def __init__(self, snapshot, text):
+        self.version = snapshot['version']
+        self.text = text
+        self.champions = {int(key): tuple(value) for key, value in snapshot['champions'].items()}
+        self.spells = {int(key): name for key, name in snapshot['spells'].items()}
+        self.runes = {int(key): name for key, name in snapshot['runes'].items()}
+        self.items = {int(key): name for key, name in snapshot['items'].items()}
+
+    def champion_name(self, champion_id):
+        champion = self.champions.get(champion_id)
+        return champion[1] if champion else None
+
+    def spell_name(self, spell_id):
+        return self.spells.get(spell_id)
+
+    def rune_name(self, rune_id):
+        return self.runes.get(rune_id)
+
+    def item_name(self, item_id):
+        return self.items.get(item_id)
+
+@lru_cache(maxsize=None)
+def bundled_versions():
+    """ Returns the bundled snapshot versions, oldest first
+    """
+    versions = [name[:-len('.json')] for name in os.listdir(STATIC_DATA_DIR) if name.endswith('.json')]
+    return sorted(versions, key=lambda v: tuple(int(part) for part in v.split('.')))
+
+def resolve_version(game_version=None):
+    """ Picks the snapshot for a patch: the newest bundled version of the same
+        major.minor as `game_version` (e.g. a match's "15.22.712.1234"), else the newest
+    """
+    versions = bundled_versions()
+    if not versions:
+        raise FileNotFoundError(f"No static data snapshots in {STATIC_DATA_DIR}")
+    if game_version:
+        patch = tuple(game_version.split('.')[:2])
+        same_patch = [v for v in versions if tuple(v.split('.')[:2]) == patch]
+        if same_patch:
+            return same_patch[-1]
+    return versions[-1]
+
+def get_static_data(game_version=None):
+    """ Returns the StaticData for a patch, loading its snapshot on first use
+    """
+    version = resolve_version(game_version)
+    registry = registries.get(version)
+    if registry is None:
+        with open(os.path.join(STATIC_DATA_DIR, f"{version}.json")) as f:
+            text = f.read()
+        registry = StaticData(json.loads(text), text)
+        registries[version] = registry
+        logger.info(f"Loaded static data {version}: {len(registry.champions)} champions, "
+                    f"{len(registry.spells)} spells, {len(registry.runes)} runes, {len(registry.items)} items")
+    return registry
@@ -0,0 +1,62 @@
+import gzip
+import json
+
+# Stored timeline format (CompressedMatchTimeline.timeline): a 4-byte header,
+# MAGIC then a format version byte, followed by that version's payload.
+#   1: one gzip member holding the timeline's JSON text.
+#   2: one gzip member holding the whole GET /match/timeline body,
+#      {"matchId":...,"matchTimeline":...}. The API sends it to gzip clients
+#      as-is, so it is never recompressed on the read path.
+# Format 2 is what gets written. Keeping the envelope in storage is what makes
+# the zero-copy read possible: a gzip body has to be a single member, so the
+# envelope can't be added around a stored timeline at read time without
+# recompressing ~1 MB. The envelope is only the matchId, and
+# decode_timeline_text recovers the bare timeline from either format; if the
+# response shape ever changes, that is a new format version, not a migration.
+MAGIC = b'RRT'
+FORMAT_GZIP = 1
+FORMAT_RESPONSE_GZIP = 2
+FORMATS = (FORMAT_GZIP, FORMAT_RESPONSE_GZIP)
+HEADER_SIZE = len(MAGIC) + 1
+COMPRESS_LEVEL = 6
+
+# Ends the matchId in a format 2 body. It can't occur inside the JSON string
+# before it, where every quote is escaped.
+TIMELINE_KEY = ',"matchTimeline":'
+
+def encode_timeline(match_id, timeline):
+    """ Returns the stored bytes for a Riot timeline document
+    """
+    text = (
+        '{"matchId":' + json.dumps(match_id) + TIMELINE_KEY
+        + json.dumps(timeline, separators=(',', ':')) + '}'
+    )
+    return (MAGIC + bytes([FORMAT_RESPONSE_GZIP])
+            + gzip.compress(text.encode('utf-8'), compresslevel=COMPRESS_LEVEL, mtime=0))
+
+def read_header(blob):
+    """ Returns (format version, payload) of stored timeline bytes
+    """
+    blob = bytes(blob)
+    if blob[:len(MAGIC)] != MAGIC or len(blob) < HEADER_SIZE:
+        raise ValueError("Not a stored timeline")
+    version = blob[len(MAGIC)]
+    if version not in FORMATS:
+        raise ValueError(f"Unsupported timeline format version: {version}")
+    return version, blob[HEADER_SIZE:]
+
+def response_gzip(blob):
+    """ Returns the stored /match/timeline body as a single gzip member, without
+        decompressing it, or None for a format that doesn't hold the body
+    """
+    version, payload = read_header(blob)
+    return payload if version == FORMAT_RESPONSE_GZIP else None
+
+def decode_timeline_text(blob):
+    """ Returns the timeline's JSON text
+    """
+    version, payload = read_header(blob)
+    text = gzip.decompress(payload).decode('utf-8')
+    if version == FORMAT_GZIP:
+        return text
+    return text[text.index(TIMELINE_KEY) + len(TIMELINE_KEY):-1]
@@ -0,0 +1,97 @@
+""" Builds the compact static-data snapshot bundled with the Lambdas from Data Dragon.
+
+    python3 server/scripts/build_static_data.py 15.22.1
+    python3 server/scripts/build_static_data.py --check
+
+Writes static_data/<version>.json into every Lambda that loads it. Each table maps
+a numeric Riot id to what the API and match cards need:
+    champions: { key: [id, name] }, spells: { key: name },
+    runes: { id: name } (styles and perks), items: { id: name }
+A snapshot missing any table is not written. --check validates the bundled snapshots
+the same way and exits non-zero if one is incomplete or differs between Lambdas.
+"""
+import json
+import os
+import sys
+import urllib.request
+
+DDRAGON_URL = "https://ddragon.leagueoflegends.com/cdn/{version}/data/en_US/{file}"
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGET_DIRS = [
+    os.path.join(SERVER_DIR, "lambda-function", "src", "static_data"),
+    os.path.join(SERVER_DIR, "match-lambda-handler", "src", "static_data"),
+]
+
+def fetch(version, file):
+    with urllib.request.urlopen(DDRAGON_URL.format(version=version, file=file)) as res:
+        return json.loads(res.read().decode())
+
+def build_snapshot(version):
+    champions = fetch(version, "champion.json")["data"]
+    spells = fetch(version, "summoner.json")["data"]
+    styles = fetch(version, "runesReforged.json")
+    items = fetch(version, "item.json")["data"]
+
+    runes = {}
+    for style in styles:
+        runes[str(style["id"])] = style["name"]
+        for slot in style["slots"]:
+            for rune in slot["runes"]:
+                runes[str(rune["id"])] = rune["name"]
+
+    return {
+        "version": version,
+        "champions": {c["key"]: [c["id"], c["name"]] for c in champions.values()},
+        "spells": {s["key"]: s["name"] for s in spells.values()},
+        "runes": runes,
+        "items": {item_id: item["name"] for item_id, item in items.items()},
+    }
+
+def snapshot_problems(snapshot):
+    """ Returns what is missing from a snapshot; empty when it is complete
+    """
+    problems = [f"no {table}" for table in ("champions", "spells", "runes", "items") if not snapshot.get(table)]
+    runes = snapshot.get("runes") or {}
+    if runes and not any(int(rune_id) % 100 for rune_id in runes):
+        problems.append("runes has styles but no perks")
+    return problems
+
+def check_bundled():
+    """ Validates every bundled snapshot. Return: whether all of them are complete and identical
+    """
+    ok = True
+    snapshots = {}
+    for target in TARGET_DIRS:
+        for name in sorted(os.listdir(target)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(target, name)) as f:
+                text = f.read()
+            problems = snapshot_problems(json.loads(text))
+            if problems:
+                print(f"{target}/{name}: {', '.join(problems)}")
+                ok = False
+            if snapshots.setdefault(name, text) != text:
+                print(f"{target}/{name}: differs from the other Lambdas' copy")
+                ok = False
+    return ok
+
+def main():
+    if sys.argv[1:] == ["--check"]:
+        sys.exit(0 if check_bundled() else 1)
+    if len(sys.argv) != 2:
+        sys.exit("usage: build_static_data.py <ddragon version> | --check")
+    snapshot = build_snapshot(sys.argv[1])
+    problems = snapshot_problems(snapshot)
+    if problems:
+        sys.exit(f"Data Dragon {snapshot['version']} is incomplete: {', '.join(problems)}")
+    text = json.dumps(snapshot, separators=(",", ":"), sort_keys=True)
+    for target in TARGET_DIRS:
+        os.makedirs(target, exist_ok=True)
+        with open(os.path.join(target, f"{snapshot['version']}.json"), "w") as f:
+            f.write(text)
+        print(f"Wrote {target}/{snapshot['version']}.json")
+
+if __name__ == "__main__":
+    main()